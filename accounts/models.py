@@ -80,6 +80,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     institution_email = models.EmailField(null=True, blank=True)  # NULL for admins
     license_number = models.CharField(max_length=100, null=True, blank=True)  # NULL for admins
     years_experience = models.IntegerField(null=True, blank=True)
+    # Start of the soonest open Availability slot; kept up to date by
+    # core.services.availability_changed (repair: manage.py refresh_next_open_slots)
+    next_open_slot_at = models.DateTimeField(null=True, blank=True, db_index=True)
     bio = models.TextField(null=True, blank=True)  # NULL for admins
 
     # File uploads - NULL for admins
@@ -5,12 +5,22 @@ from django.urls import path, reverse
 from django.http import HttpResponseRedirect, JsonResponse
 from django.contrib import messages
 from django.core.paginator import Paginator
+from django.db.models import Max
+from django.utils.text import slugify
+from django.utils.timezone import localdate
 from urllib.parse import quote
+from datetime import date, timedelta
+import calendar
+
+import numpy as np
 
 from accounts.models import User
 from accounts.admin import CustomUserAdmin
 from accounts.forms import EmailAuthenticationForm
-from .models import RecentActivity, WellnessTip
+from core.models import SPECIALIZATIONS
+from core.services import counselor_profile_changed
+from .analytics import capacity_heatmaps
+from .models import CapacityRollup, RecentActivity, WellnessTip
 from django import forms
 
 
@@ -40,9 +50,56 @@ class CustomAdminSite(admin.AdminSite):
             path('wellness-tips/add/', self.admin_view(self.add_wellness_tip), name='add_wellness_tip'),
             path('wellness-tips/<int:tip_id>/edit/', self.admin_view(self.edit_wellness_tip), name='edit_wellness_tip'),
             path('wellness-tips/<int:tip_id>/delete/', self.admin_view(self.delete_wellness_tip), name='delete_wellness_tip'),
+            path('capacity/', self.admin_view(self.capacity_view), name='capacity'),
         ]
         return custom_urls + urls
     
+    # --- Capacity analytics ---
+    def capacity_view(self, request):
+        """Weekday x hour supply/demand heatmaps, read from CapacityRollup only."""
+        today = localdate()
+        try:
+            date_from = date.fromisoformat(request.GET.get('from') or (today - timedelta(days=28)).isoformat())
+            date_to = date.fromisoformat(request.GET.get('to') or (today + timedelta(days=28)).isoformat())
+        except ValueError:
+            date_from, date_to = today - timedelta(days=28), today + timedelta(days=28)
+        specialization = request.GET.get('specialization') or None
+
+        maps = capacity_heatmaps(date_from, date_to, specialization)
+        busy_hours = np.flatnonzero((maps['seats'] + maps['booked'] + maps['cancelled']).sum(axis=0))
+        hours = list(range(busy_hours.min(), busy_hours.max() + 1)) if busy_hours.size else []
+        peak = maps['utilization'].max() or 1
+
+        rows = []
+        for weekday, name in enumerate(calendar.day_name):
+            rows.append({
+                'weekday': name,
+                'cells': [
+                    {
+                        'seats': int(maps['seats'][weekday, hour]),
+                        'booked': int(maps['booked'][weekday, hour]),
+                        'cancelled': int(maps['cancelled'][weekday, hour]),
+                        'utilization': round(float(maps['utilization'][weekday, hour]) * 100),
+                        'shortfall': int(maps['shortfall'][weekday, hour]),
+                        'intensity': round(float(maps['utilization'][weekday, hour]) / peak, 2),
+                    }
+                    for hour in hours
+                ],
+            })
+
+        context = {
+            'rows': rows,
+            'hours': hours,
+            'date_from': date_from,
+            'date_to': date_to,
+            'specialization': specialization or '',
+            'specializations': [(slugify(s), s) for s in SPECIALIZATIONS],
+            'totals': {measure: int(maps[measure].sum()) for measure in ('seats', 'booked', 'cancelled')},
+            'last_rollup': CapacityRollup.objects.aggregate(last=Max('updated_at'))['last'],
+            **self.each_context(request),
+        }
+        return render(request, 'admin_panel/capacity.html', context)
+
     # --- Wellness Tips views ---
     def wellness_tips_list_view(self, request):
         tips = WellnessTip.objects.all()
@@ -154,6 +211,7 @@ class CustomAdminSite(admin.AdminSite):
             counselor.is_verified = True
             counselor.is_active = True
             counselor.save()
+            counselor_profile_changed(counselor.id)  # list or delist in the search and matching indexes
             
             # Create activity record
             RecentActivity.objects.create(
@@ -172,6 +230,7 @@ class CustomAdminSite(admin.AdminSite):
             counselor.is_verified = False
             counselor.is_active = False
             counselor.save()
+            counselor_profile_changed(counselor.id)  # list or delist in the search and matching indexes
             
             # Create activity record
             RecentActivity.objects.create(
@@ -0,0 +1,107 @@
+# admin_panel/analytics.py
+#
+# Capacity rollups: per-day aggregation into CapacityRollup and the
+# weekday x hour heatmaps the admin capacity page is drawn from.
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractHour
+from django.utils.text import slugify
+
+from accounts.models import User
+from core.models import SPECIALIZATIONS, Appointment, Availability
+from .models import CapacityRollup
+
+HOURS = 24
+MEASURES = ('seats', 'booked', 'cancelled')
+
+
+def counselor_specializations():
+    """counselor id -> list of specialization slugs (one query)."""
+    return {
+        c.id: sorted({slugify(s) for s in c.get_specializations_list()}) or ['unspecified']
+        for c in User.objects.filter(role='counselor').only('id', 'specializations')
+    }
+
+
+def rollup_day(day, specializations_by_counselor):
+    """
+    Recompute one day's rollup rows: two GROUP BY queries, a NumPy
+    scatter-add into (specialization, hour) matrices, and a delete+insert
+    of the day's non-empty cells. Safe to re-run for the same day.
+    """
+    slugs = sorted(
+        {slug for slugs in specializations_by_counselor.values() for slug in slugs}
+        | {slugify(s) for s in SPECIALIZATIONS}
+    )
+    row_of = {slug: i for i, slug in enumerate(slugs)}
+    totals = {measure: np.zeros((len(slugs), HOURS), dtype=np.int64) for measure in MEASURES}
+
+    def scatter(measure, counselor_id, hour, value):
+        rows = [row_of[slug] for slug in specializations_by_counselor.get(counselor_id, ['unspecified'])
+                if slug in row_of]
+        np.add.at(totals[measure], (rows, hour), value)
+
+    supply = (
+        Availability.objects.filter(date=day)
+        .exclude_vacation()
+        .values('counselor_id', hour=ExtractHour('start_time'))
+        .annotate(seats=Sum('total_slots'))
+    )
+    for row in supply:
+        scatter('seats', row['counselor_id'], row['hour'], row['seats'])
+
+    demand = (
+        Appointment.objects.filter(date=day)
+        .values('counselor_id', hour=ExtractHour('time'))
+        .annotate(
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            booked=Count('id', filter=~Q(status='cancelled')),
+        )
+    )
+    for row in demand:
+        scatter('booked', row['counselor_id'], row['hour'], row['booked'])
+        scatter('cancelled', row['counselor_id'], row['hour'], row['cancelled'])
+
+    filled = np.argwhere(sum(totals[measure] for measure in MEASURES) > 0)
+    rows = [
+        CapacityRollup(
+            date=day,
+            weekday=day.weekday(),
+            hour=int(hour),
+            specialization=slugs[spec],
+            **{measure: int(totals[measure][spec, hour]) for measure in MEASURES},
+        )
+        for spec, hour in filled
+    ]
+    with transaction.atomic():
+        CapacityRollup.objects.filter(date=day).delete()
+        CapacityRollup.objects.bulk_create(rows)
+    return len(rows)
+
+
+def capacity_heatmaps(date_from, date_to, specialization=None):
+    """
+    7 x 24 matrices (weekday x hour) of seats, booked and cancelled summed
+    over [date_from, date_to], read from the rollup table only.
+    """
+    rollups = CapacityRollup.objects.filter(date__range=(date_from, date_to))
+    if specialization:
+        rollups = rollups.filter(specialization=specialization)
+    cells = np.array(
+        list(rollups.values_list('weekday', 'hour', *MEASURES)), dtype=np.int64
+    ).reshape(-1, 2 + len(MEASURES))
+
+    maps = {}
+    for i, measure in enumerate(MEASURES):
+        grid = np.zeros((7, HOURS), dtype=np.int64)
+        np.add.at(grid, (cells[:, 0], cells[:, 1]), cells[:, 2 + i])
+        maps[measure] = grid
+    # Share of offered seats that were booked; cells with no seats stay 0
+    maps['utilization'] = np.divide(
+        maps['booked'], maps['seats'], out=np.zeros((7, HOURS)), where=maps['seats'] > 0
+    )
+    # Bookings beyond the seats offered (from overbooked or later-deleted slots)
+    maps['shortfall'] = np.clip(maps['booked'] - maps['seats'], 0, None)
+    return maps
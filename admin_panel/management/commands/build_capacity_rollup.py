@@ -0,0 +1,42 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import localdate
+
+from admin_panel.analytics import counselor_specializations, rollup_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the CapacityRollup table one day at a time. By default only "
+        "the days that can still change are rebuilt (yesterday through the "
+        "availability window); pass --from/--to to backfill history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--days-ahead', type=int, default=28)
+
+    def handle(self, *args, **opts):
+        today = localdate()
+        try:
+            date_from = date.fromisoformat(opts['date_from']) if opts['date_from'] else today - timedelta(days=1)
+            date_to = date.fromisoformat(opts['date_to']) if opts['date_to'] else today + timedelta(days=opts['days_ahead'])
+        except ValueError:
+            raise CommandError('Dates must be YYYY-MM-DD')
+        if date_from > date_to:
+            raise CommandError('--from must not be after --to')
+
+        started = time.monotonic()
+        specializations = counselor_specializations()
+        day, days, cells = date_from, 0, 0
+        while day <= date_to:
+            cells += rollup_day(day, specializations)
+            days += 1
+            day += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {days} day(s) into {cells} cell(s) in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0002_wellnesstip'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('specialization', models.CharField(max_length=100)),
+                ('seats', models.PositiveIntegerField(default=0)),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['specialization', 'date'], name='capacity_spec_date_idx')],
+                'unique_together': {('date', 'specialization', 'hour')},
+            },
+        ),
+    ]
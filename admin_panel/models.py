@@ -67,4 +67,29 @@ class WellnessTip(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class CapacityRollup(models.Model):
+    """
+    Seats offered vs. sessions booked/cancelled per day, specialization and
+    start hour. Filled by `manage.py build_capacity_rollup` and read by the
+    capacity page so it never scans Availability/Appointment directly.
+    A counselor with several specializations counts toward each of them.
+    """
+    date = models.DateField()
+    weekday = models.PositiveSmallIntegerField()  # 0 = Monday
+    hour = models.PositiveSmallIntegerField()
+    specialization = models.CharField(max_length=100)  # slug
+    seats = models.PositiveIntegerField(default=0)
+    booked = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'specialization', 'hour')
+        indexes = [
+            models.Index(fields=['specialization', 'date'], name='capacity_spec_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.specialization} {self.date} {self.hour:02d}:00"
@@ -53,6 +53,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'core.queries': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -84,6 +89,7 @@ INSTALLED_APPS = [
 # Middleware
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',  # first, so the other middleware's queries count too
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -92,6 +98,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Query budgets (core.middleware): on in DEBUG, reported via X-Query-* headers and the core.queries logger
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET = 50
+QUERY_REPEAT_THRESHOLD = 5
+
 ROOT_URLCONF = 'config.urls'
 
 # Templates
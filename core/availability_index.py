@@ -0,0 +1,206 @@
+# core/availability_index.py
+#
+# In-memory "who is free at time X" index. Each counselor's open time is
+# kept as a bitset per day (one bit per 15-minute unit, packed with NumPy),
+# so a search over many counselors and days is a handful of vectorized
+# AND/ANY operations instead of loading every Availability row.
+#
+# The index lives in process memory (like the locmem cache). Writes call
+# mark_dirty() through core.services.availability_changed and the affected
+# counselors are reloaded on the next search; a full rebuild happens every
+# REBUILD_INTERVAL seconds to pick up anything else (new counselors,
+# profile edits made in other processes).
+
+import threading
+import time as _time
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.utils.text import slugify
+from django.utils.timezone import localdate
+
+from .models import Availability
+
+UNIT_MINUTES = 15
+UNITS_PER_DAY = 24 * 60 // UNIT_MINUTES
+REBUILD_INTERVAL = 300
+
+SLOT_FIELDS = ('id', 'counselor_id', 'weekday', 'date', 'start_time', 'end_time', 'total_slots', 'booked_slots')
+
+
+def time_to_unit(value, round_up=False):
+    minutes = value.hour * 60 + value.minute
+    unit, remainder = divmod(minutes, UNIT_MINUTES)
+    return unit + 1 if round_up and remainder else unit
+
+
+def window_bits(start_unit, end_unit):
+    """Packed bitset with units [start_unit, end_unit) set."""
+    bits = np.zeros(UNITS_PER_DAY, dtype=bool)
+    bits[start_unit:end_unit] = True
+    return np.packbits(bits)
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._dirty = set()
+        self.rows = {}            # counselor id -> row in the bitsets
+        self.counselors = []      # row -> {"id", "name", "specializations"}
+        self.days = {}            # date -> uint8 array (n_counselors, UNITS_PER_DAY / 8)
+        self.slots = {}           # (counselor id, date) -> [slot dict, ...] sorted by start
+
+    # -----------------------------
+    # MAINTENANCE
+    # -----------------------------
+
+    def mark_dirty(self, counselor_id):
+        with self._lock:
+            self._dirty.add(counselor_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _load_counselors(self, ids=None):
+        User = get_user_model()
+        counselors = User.objects.filter(role='counselor', is_verified=True, is_active=True)
+        if ids is not None:
+            counselors = counselors.filter(id__in=ids)
+        return [
+            {
+                "id": c.id,
+                "name": c.full_name,
+                "specializations": {slugify(s) for s in c.get_specializations_list()},
+            }
+            for c in counselors.only('id', 'full_name', 'specializations')
+        ]
+
+    def _rebuild(self):
+        self.counselors = self._load_counselors()
+        self.rows = {c["id"]: row for row, c in enumerate(self.counselors)}
+        self.slots = {}
+        self.days = {}
+        self._dirty = set()
+
+        slots = (
+            Availability.objects.filter(counselor_id__in=list(self.rows))
+            .upcoming()
+            .exclude_vacation()
+            .with_open_seats()
+            .order_by('date', 'start_time')
+            .values(*SLOT_FIELDS)
+        )
+        for slot in slots:
+            self.slots.setdefault((slot['counselor_id'], slot['date']), []).append(slot)
+
+        n = len(self.counselors)
+        unpacked = {}
+        for (counselor_id, day), day_slots in self.slots.items():
+            bits = unpacked.setdefault(day, np.zeros((n, UNITS_PER_DAY), dtype=bool))
+            row = self.rows[counselor_id]
+            for slot in day_slots:
+                bits[row, time_to_unit(slot['start_time']):time_to_unit(slot['end_time'], round_up=True)] = True
+        self.days = {day: np.packbits(bits, axis=1) for day, bits in unpacked.items()}
+        self._built_at = _time.monotonic()
+
+    def _refresh_dirty(self):
+        """Reload only the counselors touched since the last search (one query for slots, one for profiles)."""
+        dirty, self._dirty = self._dirty, set()
+        profiles = self._load_counselors(dirty)
+        listed = {profile["id"] for profile in profiles}
+        if listed - set(self.rows) or (dirty & set(self.rows)) - listed:
+            # Counselor listed or delisted: rows would shift, so rebuild everything
+            self._rebuild()
+            return
+
+        for profile in profiles:
+            self.counselors[self.rows[profile["id"]]] = profile
+        dirty = {cid for cid in dirty if cid in self.rows}
+        if not dirty:
+            return
+
+        for key in [key for key in self.slots if key[0] in dirty]:
+            del self.slots[key]
+        for bits in self.days.values():
+            for cid in dirty:
+                bits[self.rows[cid]] = 0
+
+        slots = (
+            Availability.objects.filter(counselor_id__in=dirty)
+            .upcoming()
+            .exclude_vacation()
+            .with_open_seats()
+            .order_by('date', 'start_time')
+            .values(*SLOT_FIELDS)
+        )
+        n = len(self.counselors)
+        for slot in slots:
+            self.slots.setdefault((slot['counselor_id'], slot['date']), []).append(slot)
+            day_bits = self.days.setdefault(slot['date'], np.zeros((n, UNITS_PER_DAY // 8), dtype=np.uint8))
+            row = self.rows[slot['counselor_id']]
+            unpacked = np.unpackbits(day_bits[row])
+            unpacked[time_to_unit(slot['start_time']):time_to_unit(slot['end_time'], round_up=True)] = 1
+            day_bits[row] = np.packbits(unpacked)
+
+    def _ensure_fresh(self):
+        if self._built_at is None or _time.monotonic() - self._built_at > REBUILD_INTERVAL:
+            self._rebuild()
+        elif self._dirty:
+            self._refresh_dirty()
+
+    # -----------------------------
+    # SEARCH
+    # -----------------------------
+
+    def search(self, start_time, end_time, date_from=None, date_to=None, weekday=None, specialization=None, k=10):
+        """
+        Soonest k open slots that fit inside [start_time, end_time) on the
+        matching days, across all counselors.
+        """
+        today = localdate()
+        date_from = max(date_from or today, today)
+        date_to = date_to or date_from + timedelta(days=60)
+        start_unit = time_to_unit(start_time)
+        end_unit = time_to_unit(end_time, round_up=True)
+
+        with self._lock:
+            self._ensure_fresh()
+
+            days = sorted(
+                day for day in self.days
+                if date_from <= day <= date_to and (weekday is None or day.strftime('%A') == weekday)
+            )
+            if not days or not self.counselors:
+                return []
+
+            counselor_mask = np.ones(len(self.counselors), dtype=bool)
+            if specialization and specialization != 'all':
+                counselor_mask = np.array([specialization in c["specializations"] for c in self.counselors])
+
+            # (days, counselors, bytes) AND window -> any bit set -> (days, counselors)
+            stacked = np.stack([self.days[day] for day in days])
+            hits = np.bitwise_and(stacked, window_bits(start_unit, end_unit)).any(axis=2) & counselor_mask
+
+            results = []
+            for day_index in np.flatnonzero(hits.any(axis=1)):
+                day = days[day_index]
+                day_matches = []
+                for row in np.flatnonzero(hits[day_index]):
+                    counselor = self.counselors[row]
+                    for slot in self.slots.get((counselor["id"], day), []):
+                        # Bits only say "some overlap"; keep slots fully inside the window
+                        if start_unit <= time_to_unit(slot['start_time']) and \
+                                time_to_unit(slot['end_time'], round_up=True) <= end_unit:
+                            day_matches.append((slot['start_time'], counselor, slot))
+                day_matches.sort(key=lambda match: (match[0], match[1]["id"]))
+                results.extend(day_matches)
+                if len(results) >= k:
+                    break
+
+            return [(counselor, slot) for _, counselor, slot in results[:k]]
+
+
+availability_index = AvailabilityIndex()
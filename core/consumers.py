@@ -22,3 +22,6 @@ class SessionNotificationConsumer(AsyncWebsocketConsumer):
 
     async def session_started(self, event):
         await self.send(text_data=json.dumps(event))
+
+    async def waitlist_promoted(self, event):
+        await self.send(text_data=json.dumps(event))
@@ -0,0 +1,65 @@
+# core/decorators.py
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+# How long a stored response can be replayed for the same Idempotency-Key
+IDEMPOTENCY_KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+_IN_PROGRESS = 'in-progress'
+
+
+def idempotent(view_func):
+    """
+    Honor an `Idempotency-Key` header on POST requests.
+
+    The first request runs the view and its response is stored as a small
+    (status, content type, body) tuple. A retry with the same key, user and
+    URL gets that response back from a single cache read and never touches
+    the database. A retry that arrives while the first is still running gets
+    a 409. Requests without the header are not affected.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if request.method != 'POST' or not key:
+            return view_func(request, *args, **kwargs)
+        if len(key) > 255:
+            return JsonResponse({'error': 'Idempotency-Key is too long'}, status=400)
+
+        digest = hashlib.sha256(f"{request.user.pk}:{request.path}:{key}".encode()).hexdigest()
+        cache_key = f"idempotency_{digest}"
+
+        stored = cache.get(cache_key)
+        if stored == _IN_PROGRESS:
+            return JsonResponse({'error': 'This request is already being processed'}, status=409)
+        if stored is not None:
+            status, content_type, body = stored
+            response = HttpResponse(body, status=status, content_type=content_type)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        if not cache.add(cache_key, _IN_PROGRESS, 60):
+            return JsonResponse({'error': 'This request is already being processed'}, status=409)
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        # Server errors are not stored so the client can retry them for real
+        if response.status_code < 500 and not response.streaming:
+            cache.set(
+                cache_key,
+                (response.status_code, response['Content-Type'], response.content),
+                IDEMPOTENCY_KEY_TTL,
+            )
+        else:
+            cache.delete(cache_key)
+        return response
+
+    return wrapper
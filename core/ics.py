@@ -0,0 +1,80 @@
+# core/ics.py
+#
+# Minimal iCalendar (RFC 5545) rendering for the appointment feed. Events
+# are produced one at a time so the view can stream them straight from a
+# queryset iterator.
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+PRODID = "-//MindEase//Appointments//EN"
+DEFAULT_SESSION_MINUTES = 50
+
+
+def _escape(text):
+    return (
+        str(text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Fold content lines longer than 75 octets (continuation lines start with a space)."""
+    parts, current, size, limit = [], "", 0, 75
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > limit:
+            parts.append(current)
+            current, size, limit = "", 0, 74
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def calendar_header(name):
+    yield "BEGIN:VCALENDAR\r\n"
+    yield "VERSION:2.0\r\n"
+    yield _fold(f"PRODID:{PRODID}")
+    yield "CALSCALE:GREGORIAN\r\n"
+    yield _fold(f"X-WR-CALNAME:{_escape(name)}")
+
+
+def calendar_footer():
+    yield "END:VCALENDAR\r\n"
+
+
+def appointment_event(appointment, viewer):
+    """VEVENT for one appointment, titled from the viewer's side."""
+    start = timezone.make_aware(datetime.combine(appointment.date, appointment.time))
+    if appointment.slot_id and appointment.slot.end_time > appointment.time:
+        end = timezone.make_aware(datetime.combine(appointment.date, appointment.slot.end_time))
+    else:
+        end = start + timedelta(minutes=DEFAULT_SESSION_MINUTES)
+
+    other = appointment.patient if viewer.id == appointment.counselor_id else appointment.counselor
+    status = "CANCELLED" if appointment.status == "cancelled" else "CONFIRMED"
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:appointment-{appointment.id}@mindease",
+        f"DTSTAMP:{_utc(appointment.updated_at)}",
+        f"LAST-MODIFIED:{_utc(appointment.updated_at)}",
+        f"DTSTART:{_utc(start)}",
+        f"DTEND:{_utc(end)}",
+        f"SUMMARY:{_escape(f'Counseling session with {other.full_name}')}",
+        f"STATUS:{status}",
+    ]
+    if appointment.google_meet_link:
+        lines.append(f"URL:{appointment.google_meet_link}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
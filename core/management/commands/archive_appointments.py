@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import localdate
+
+from core.models import Appointment, ArchivedAppointment
+
+# Finished sessions older than this many days move to the archive table
+APPOINTMENT_ARCHIVE_AFTER_DAYS = getattr(settings, 'APPOINTMENT_ARCHIVE_AFTER_DAYS', 365)
+
+FINISHED_STATUSES = ['completed', 'cancelled', 'missed', 'expired']
+
+
+class Command(BaseCommand):
+    help = (
+        "Move finished appointments older than APPOINTMENT_ARCHIVE_AFTER_DAYS into "
+        "ArchivedAppointment. Each chunk is copied and deleted in its own short "
+        "transaction, so the mover can run next to live traffic and be stopped at any time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=APPOINTMENT_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between chunks')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be moved')
+
+    def handle(self, *args, **opts):
+        cutoff = localdate() - timedelta(days=opts['older_than_days'])
+        candidates = Appointment.objects.filter(date__lt=cutoff, status__in=FINISHED_STATUSES)
+
+        if opts['dry_run']:
+            self.stdout.write(f'Would archive {candidates.count()} appointment(s) dated before {cutoff}')
+            return
+
+        started = time.monotonic()
+        moved = chunks = 0
+        last_id = 0
+        while True:
+            ids = list(
+                candidates.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:opts['chunk_size']]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            with transaction.atomic():
+                # Lock the chunk so a concurrent edit can't slip in between copy and delete
+                rows = list(candidates.filter(id__in=ids).select_for_update(of=('self',)).select_related('slot'))
+                ArchivedAppointment.objects.bulk_create(
+                    [ArchivedAppointment.from_appointment(a) for a in rows],
+                    ignore_conflicts=True,
+                )
+                Appointment.objects.filter(id__in=[a.id for a in rows]).delete()
+            moved += len(rows)
+            chunks += 1
+            if opts['pause']:
+                time.sleep(opts['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} appointment(s) in {chunks} chunk(s) in {time.monotonic() - started:.2f}s'
+        ))
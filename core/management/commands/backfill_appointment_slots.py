@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Appointment, Availability
+
+
+class Command(BaseCommand):
+    help = (
+        "Link existing appointments to their Availability slot (Appointment.slot). "
+        "Works in id-ordered chunks so it can run against a live database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be linked')
+
+    def handle(self, *args, **opts):
+        chunk_size = opts['chunk_size']
+        last_id = 0
+        linked = unmatched = 0
+
+        while True:
+            chunk = list(
+                Appointment.objects.filter(slot__isnull=True, id__gt=last_id)
+                .order_by('id')
+                .only('id', 'counselor_id', 'date', 'time')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            # One lookup per chunk instead of one per appointment
+            slots = Availability.objects.filter(
+                counselor_id__in={a.counselor_id for a in chunk},
+                date__in={a.date for a in chunk},
+            ).values_list('id', 'counselor_id', 'date', 'start_time')
+            slot_ids = {(c, d, t): slot_id for slot_id, c, d, t in slots}
+
+            to_update = []
+            for appointment in chunk:
+                slot_id = slot_ids.get((appointment.counselor_id, appointment.date, appointment.time))
+                if slot_id is None:
+                    unmatched += 1
+                    continue
+                appointment.slot_id = slot_id
+                to_update.append(appointment)
+
+            if to_update and not opts['dry_run']:
+                with transaction.atomic():
+                    Appointment.objects.bulk_update(to_update, ['slot'])
+            linked += len(to_update)
+
+        verb = 'Would link' if opts['dry_run'] else 'Linked'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {linked} appointment(s); {unmatched} had no matching slot'))
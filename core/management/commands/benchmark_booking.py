@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+from datetime import time as dtime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import Appointment, Availability
+from core.services import BookingError, book_slot
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress-test the booking engine: many threads race for a handful of seats. "
+        "Creates throwaway users/slots, checks nothing was overbooked and reports bookings/sec."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=200, help='Number of concurrent patients')
+        parser.add_argument('--threads', type=int, default=32, help='Worker threads')
+        parser.add_argument('--slots', type=int, default=5, help='Availability slots to race for')
+        parser.add_argument('--seats', type=int, default=3, help='total_slots per Availability')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows')
+
+    def handle(self, *args, **opts):
+        if opts['threads'] < 1 or opts['patients'] < 1:
+            raise CommandError('--threads and --patients must be positive')
+
+        run_id = uuid.uuid4().hex[:8]
+        counselor = User.objects.create_user(
+            email=f'bench-counselor-{run_id}@example.com', full_name='Bench Counselor', role='counselor'
+        )
+        patients = [
+            User.objects.create_user(email=f'bench-patient-{run_id}-{i}@example.com', full_name=f'Bench Patient {i}')
+            for i in range(opts['patients'])
+        ]
+        day = timezone.localdate() + timedelta(days=1)
+        slots = [
+            Availability.objects.create(
+                counselor=counselor,
+                date=day,
+                start_time=dtime(8 + i),
+                end_time=dtime(9 + i),
+                total_slots=opts['seats'],
+            )
+            for i in range(opts['slots'])
+        ]
+
+        # Every patient tries every slot, so the once-per-day rule is raced too
+        jobs = [(p, s.id) for p in patients for s in slots]
+        lock = threading.Lock()
+        results = {'booked': 0, 'rejected': 0, 'errors': 0}
+
+        def worker(chunk):
+            close_old_connections()
+            try:
+                for patient, slot_id in chunk:
+                    try:
+                        book_slot(patient, counselor, slot_id)
+                        key = 'booked'
+                    except BookingError:
+                        key = 'rejected'
+                    except Exception:  # lock timeouts etc. on backends without row locking
+                        key = 'errors'
+                    with lock:
+                        results[key] += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(jobs[i::opts['threads']],))
+            for i in range(opts['threads'])
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        overbooked = 0
+        for slot in Availability.objects.filter(id__in=[s.id for s in slots]):
+            appointments = Appointment.objects.filter(counselor=counselor, date=slot.date, time=slot.start_time).count()
+            if slot.booked_slots > slot.total_slots or slot.booked_slots != appointments:
+                overbooked += 1
+        # All slots share one day, so more than one appointment per patient breaks the daily rule
+        double_booked = (
+            Appointment.objects.filter(counselor=counselor)
+            .values('patient')
+            .annotate(n=Count('id'))
+            .filter(n__gt=1)
+            .count()
+        )
+
+        self.stdout.write(
+            f"{len(jobs)} attempts in {elapsed:.2f}s "
+            f"({len(jobs) / elapsed:.0f} attempts/sec, {results['booked'] / elapsed:.0f} bookings/sec)"
+        )
+        self.stdout.write(
+            f"booked={results['booked']} rejected={results['rejected']} errors={results['errors']} "
+            f"capacity={opts['slots'] * opts['seats']}"
+        )
+
+        if not opts['keep']:
+            Appointment.objects.filter(counselor=counselor).delete()
+            User.objects.filter(id__in=[p.id for p in patients] + [counselor.id]).delete()
+
+        if overbooked or double_booked:
+            raise CommandError(f'{overbooked} slot(s) overbooked, {double_booked} patient(s) double-booked')
+        self.stdout.write(self.style.SUCCESS('No overbooking detected'))
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.ics import DEFAULT_SESSION_MINUTES
+from core.models import Appointment, ArchivedAppointment, CounselorStats
+
+
+def rollup(queryset, end_time_field):
+    """Per-counselor totals for one table in a single GROUP BY."""
+    duration = Coalesce(
+        ExpressionWrapper(F(end_time_field) - F('time'), output_field=DurationField()),
+        Value(timedelta(minutes=DEFAULT_SESSION_MINUTES)),
+        output_field=DurationField(),
+    )
+    return (
+        queryset.values('counselor_id')
+        .annotate(
+            sessions=Count('id', filter=~Q(status='cancelled')),
+            completed=Count('id', filter=Q(status='completed')),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            delivered=Sum(duration, filter=Q(status='completed')),
+        )
+        .order_by()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute CounselorStats for every counselor from Appointment and "
+        "ArchivedAppointment. Writes keep the table current; run this after "
+        "deploying it or after manual data fixes."
+    )
+
+    def handle(self, *args, **opts):
+        totals = {}
+        for queryset, end_time_field in (
+            (Appointment.objects.all(), 'slot__end_time'),
+            (ArchivedAppointment.objects.all(), 'end_time'),
+        ):
+            for row in rollup(queryset, end_time_field):
+                entry = totals.setdefault(row['counselor_id'], {
+                    'sessions': 0, 'completed': 0, 'cancelled': 0, 'delivered_minutes': 0, 'patients': set(),
+                })
+                entry['sessions'] += row['sessions']
+                entry['completed'] += row['completed']
+                entry['cancelled'] += row['cancelled']
+                if row['delivered']:
+                    entry['delivered_minutes'] += int(row['delivered'].total_seconds() // 60)
+
+        # Distinct patients can't be summed across the two tables, so collect the pairs
+        for queryset in (Appointment.objects, ArchivedAppointment.objects):
+            pairs = queryset.filter(status='completed').values_list('counselor_id', 'patient_id').distinct()
+            for counselor_id, patient_id in pairs:
+                totals[counselor_id]['patients'].add(patient_id)
+
+        stats = [
+            CounselorStats(counselor_id=counselor_id, patients=len(entry.pop('patients')), **entry)
+            for counselor_id, entry in totals.items()
+        ]
+        with transaction.atomic():
+            CounselorStats.objects.all().delete()
+            CounselorStats.objects.bulk_create(stats)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {len(stats)} counselor(s)'))
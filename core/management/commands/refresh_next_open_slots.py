@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from core.models import Availability
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute User.next_open_slot_at for every counselor from one window query. "
+        "Writes normally keep it current; run this from cron to drop slots that have "
+        "started since (or after manual data fixes). --stale-only limits it to counselors "
+        "whose stored slot has already started, which is cheap enough to run every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--stale-only', action='store_true', help='Only counselors whose stored slot has started')
+
+    def handle(self, *args, **opts):
+        counselors = User.objects.filter(role='counselor')
+        if opts['stale_only']:
+            counselors = counselors.filter(next_open_slot_at__lt=timezone.now())
+
+        # First open slot per counselor: ROW_NUMBER() over (counselor ORDER BY date, start_time) = 1
+        firsts = (
+            Availability.objects.filter(counselor__in=counselors.values('id'))
+            .not_started()
+            .exclude_vacation()
+            .with_open_seats()
+            .annotate(row=Window(
+                RowNumber(),
+                partition_by=[F('counselor_id')],
+                order_by=[F('date').asc(), F('start_time').asc()],
+            ))
+            .filter(row=1)
+            .values_list('counselor_id', 'date', 'start_time')
+        )
+        next_open = {
+            counselor_id: timezone.make_aware(datetime.combine(day, start))
+            for counselor_id, day, start in firsts
+        }
+
+        counselors = list(counselors.only('id', 'next_open_slot_at'))
+        changed = []
+        for counselor in counselors:
+            value = next_open.get(counselor.id)
+            if counselor.next_open_slot_at != value:
+                counselor.next_open_slot_at = value
+                changed.append(counselor)
+
+        # One UPDATE ... CASE per chunk
+        with transaction.atomic():
+            User.objects.bulk_update(changed, ['next_open_slot_at'], batch_size=opts['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {len(changed)} of {len(counselors)} counselor(s); {len(next_open)} have an open slot'
+        ))
@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Appointment, Availability
+from core.services import availability_changed, calendar_changed
+
+# A pending session counts as missed this long after its start time
+MISSED_GRACE_MINUTES = getattr(settings, 'MISSED_GRACE_MINUTES', 60)
+
+
+def before(moment, date_field, time_field):
+    """Q for rows whose (date, time) is earlier than `moment` (naive local datetime)."""
+    return Q(**{f'{date_field}__lt': moment.date()}) | Q(
+        **{date_field: moment.date(), f'{time_field}__lt': moment.time()}
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Close out stale rows: pending appointments past their start become 'missed', "
+        "sessions left 'started' from earlier days become 'expired', and past slots "
+        "nobody booked are deleted. Every phase works in bounded id chunks so it can "
+        "run under load."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows each phase would touch')
+
+    def handle(self, *args, **opts):
+        self.chunk_size = opts['chunk_size']
+        self.dry_run = opts['dry_run']
+        now = timezone.localtime().replace(tzinfo=None)
+
+        self.run_phase(
+            'missed',
+            Appointment.objects.filter(before(now - timedelta(minutes=MISSED_GRACE_MINUTES), 'date', 'time'))
+            .filter(status__iexact='pending'),
+            self.mark_status('missed'),
+        )
+        self.run_phase(
+            'expired',
+            Appointment.objects.filter(date__lt=now.date(), status='started'),
+            self.mark_status('expired'),
+        )
+        # Slots with appointment history (e.g. cancelled bookings) are kept
+        self.run_phase(
+            'pruned slots',
+            Availability.objects.filter(before(now, 'date', 'end_time'))
+            .filter(booked_slots=0, appointments__isnull=True),
+            self.prune_slots,
+        )
+
+    def run_phase(self, name, queryset, apply_chunk):
+        started = time.monotonic()
+        touched = 0
+        if self.dry_run:
+            touched = queryset.count()
+        else:
+            while True:
+                ids = list(queryset.order_by('id').values_list('id', flat=True)[:self.chunk_size])
+                if not ids:
+                    break
+                touched += apply_chunk(queryset, ids)
+        elapsed = time.monotonic() - started
+        verb = 'would touch' if self.dry_run else 'touched'
+        self.stdout.write(f'{name}: {verb} {touched} row(s) in {elapsed:.2f}s')
+
+    def mark_status(self, status):
+        def apply_chunk(queryset, ids):
+            rows = queryset.filter(id__in=ids)
+            users = set()
+            for patient_id, counselor_id in rows.values_list('patient_id', 'counselor_id'):
+                users.update((patient_id, counselor_id))
+            # Re-applying the phase filter keeps this safe against concurrent edits
+            updated = rows.update(status=status, updated_at=timezone.now())
+            calendar_changed(*users)
+            return updated
+        return apply_chunk
+
+    def prune_slots(self, queryset, ids):
+        rows = queryset.filter(id__in=ids)
+        counselor_ids = set(rows.values_list('counselor_id', flat=True))
+        _, deleted = rows.delete()
+        for counselor_id in counselor_ids:
+            availability_changed(counselor_id)
+        return deleted.get('core.Availability', 0)
@@ -0,0 +1,209 @@
+# core/matching.py
+#
+# Ranks counselors for a patient request. Every listed counselor is one row
+# of a cached NumPy feature matrix (specialization one-hot, soonest open
+# slot, current load, experience), so scoring a request is a single
+# vectorized pass followed by a top-k partition.
+#
+# Like the availability index this lives in process memory. Writes call
+# mark_dirty() (via core.services.availability_changed and
+# counselor_profile_changed) and only those rows are recomputed on the next
+# request; a full rebuild runs every REBUILD_INTERVAL seconds.
+
+import threading
+import time as _time
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import SPECIALIZATIONS, Appointment, Availability
+
+REBUILD_INTERVAL = 300
+
+# Relative weight of each feature in the final score (all features are scaled to 0..1)
+MATCH_WEIGHTS = getattr(settings, 'MATCH_WEIGHTS', {
+    'specialization': 0.5,
+    'availability': 0.25,
+    'load': 0.15,
+    'experience': 0.1,
+})
+
+SPECIALIZATION_SLUGS = [slugify(name) for name in SPECIALIZATIONS]
+EXPERIENCE_CAP_YEARS = 20
+NO_OPEN_SLOT = np.inf
+
+# Appointment statuses that still occupy a counselor
+ACTIVE_STATUSES = ['pending', 'Pending', 'started']
+
+
+class MatchingEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._dirty = set()
+        self.rows = {}                  # counselor id -> row
+        self.counselors = []            # row -> {"id", "name", "years_experience"}
+        self.specializations = np.zeros((0, len(SPECIALIZATION_SLUGS)), dtype=bool)
+        self.next_open = np.zeros(0)    # seconds from the build time to the next open slot (inf = none)
+        self.load = np.zeros(0)         # active upcoming appointments
+        self.experience = np.zeros(0)   # years, capped
+
+    # -----------------------------
+    # MAINTENANCE
+    # -----------------------------
+
+    def mark_dirty(self, counselor_id):
+        with self._lock:
+            self._dirty.add(counselor_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _features(self, counselor_ids=None):
+        """Feature rows for the given (or all listed) counselors: 3 queries regardless of count."""
+        User = get_user_model()
+        counselors = User.objects.filter(role='counselor', is_verified=True, is_active=True)
+        if counselor_ids is not None:
+            counselors = counselors.filter(id__in=counselor_ids)
+        profiles = list(counselors.only('id', 'full_name', 'specializations', 'years_experience').order_by('id'))
+        ids = [c.id for c in profiles]
+
+        now = timezone.localtime()
+        next_open = {}
+        slots = (
+            Availability.objects.filter(counselor_id__in=ids)
+            .upcoming()
+            .exclude_vacation()
+            .with_open_seats()
+            .order_by('counselor_id', 'date', 'start_time')
+            .values_list('counselor_id', 'date', 'start_time')
+        )
+        for counselor_id, day, start in slots:
+            if counselor_id in next_open:
+                continue
+            starts = timezone.make_aware(datetime.combine(day, start))
+            if starts >= now:
+                next_open[counselor_id] = (starts - now).total_seconds()
+
+        load = dict(
+            Appointment.objects.filter(counselor_id__in=ids, date__gte=now.date(), status__in=ACTIVE_STATUSES)
+            .values('counselor_id')
+            .annotate(n=Count('id'))
+            .values_list('counselor_id', 'n')
+        )
+
+        rows = []
+        for c in profiles:
+            slugs = {slugify(s) for s in c.get_specializations_list()}
+            rows.append({
+                "profile": {"id": c.id, "name": c.full_name, "years_experience": c.years_experience or 0},
+                "specializations": [slug in slugs for slug in SPECIALIZATION_SLUGS],
+                "next_open": next_open.get(c.id, NO_OPEN_SLOT),
+                "load": load.get(c.id, 0),
+                "experience": min(c.years_experience or 0, EXPERIENCE_CAP_YEARS),
+            })
+        return rows
+
+    def _rebuild(self):
+        rows = self._features()
+        self.counselors = [row["profile"] for row in rows]
+        self.rows = {c["id"]: i for i, c in enumerate(self.counselors)}
+        self.specializations = np.array(
+            [row["specializations"] for row in rows], dtype=bool
+        ).reshape(len(rows), len(SPECIALIZATION_SLUGS))
+        self.next_open = np.array([row["next_open"] for row in rows], dtype=float)
+        self.load = np.array([row["load"] for row in rows], dtype=float)
+        self.experience = np.array([row["experience"] for row in rows], dtype=float)
+        self._dirty = set()
+        self._built_at = _time.monotonic()
+
+    def _refresh_dirty(self):
+        dirty, self._dirty = self._dirty, set()
+        rows = self._features(dirty)
+        listed = {row["profile"]["id"] for row in rows}
+        if listed - set(self.rows) or (dirty & set(self.rows)) - listed:
+            # Counselor listed or delisted: row numbers change, so rebuild everything
+            self._rebuild()
+            return
+        for row in rows:
+            i = self.rows[row["profile"]["id"]]
+            self.counselors[i] = row["profile"]
+            self.specializations[i] = row["specializations"]
+            self.next_open[i] = row["next_open"]
+            self.load[i] = row["load"]
+            self.experience[i] = row["experience"]
+
+    def _ensure_fresh(self):
+        if self._built_at is None or _time.monotonic() - self._built_at > REBUILD_INTERVAL:
+            self._rebuild()
+        elif self._dirty:
+            self._refresh_dirty()
+
+    # -----------------------------
+    # SCORING
+    # -----------------------------
+
+    def top_k(self, specializations=(), k=10):
+        """
+        Best k counselors for the requested specialization slugs, as
+        (counselor dict, score, per-feature breakdown) tuples, best first.
+        """
+        wanted = np.array([slug in specializations for slug in SPECIALIZATION_SLUGS], dtype=bool)
+
+        with self._lock:
+            self._ensure_fresh()
+            n = len(self.counselors)
+            if n == 0:
+                return []
+
+            # Share of the requested specializations each counselor covers
+            if wanted.any():
+                spec_score = (self.specializations & wanted).sum(axis=1) / wanted.sum()
+            else:
+                spec_score = np.zeros(n)
+
+            # Sooner is better; 1 at "right now", 0.5 at one day out, 0 with no open slot
+            days_out = self.next_open / 86400.0
+            availability_score = np.where(np.isfinite(days_out), 1.0 / (1.0 + days_out), 0.0)
+
+            # Lighter caseload is better, relative to the busiest counselor
+            busiest = self.load.max()
+            load_score = 1.0 - self.load / busiest if busiest > 0 else np.ones(n)
+
+            experience_score = self.experience / EXPERIENCE_CAP_YEARS
+
+            features = np.stack([spec_score, availability_score, load_score, experience_score], axis=1)
+            weights = np.array([
+                MATCH_WEIGHTS['specialization'],
+                MATCH_WEIGHTS['availability'],
+                MATCH_WEIGHTS['load'],
+                MATCH_WEIGHTS['experience'],
+            ])
+            scores = features @ weights
+
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.lexsort((top, -scores[top]))]  # score desc, then row for stable ties
+
+            return [
+                (
+                    self.counselors[i],
+                    float(scores[i]),
+                    {
+                        "specialization": float(spec_score[i]),
+                        "availability": float(availability_score[i]),
+                        "load": float(load_score[i]),
+                        "experience": float(experience_score[i]),
+                    },
+                )
+                for i in top
+            ]
+
+
+matching_engine = MatchingEngine()
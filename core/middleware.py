@@ -0,0 +1,122 @@
+# core/middleware.py
+#
+# Per-request query accounting. Every SQL statement a request runs is
+# counted and grouped by its "shape" (the parametrized SQL with IN lists
+# collapsed), so a template that lazily follows a ForeignKey once per row
+# shows up as one shape repeated N times: the N+1 signature.
+#
+# The totals go out as X-Query-* response headers and a log line on the
+# "core.queries" logger (a warning when the request is over budget or has
+# repeated shapes). Views can declare their own budget with @query_budget;
+# core.testing uses the same counter to fail tests that exceed it.
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.queries')
+
+QUERY_BUDGET_ENABLED = getattr(settings, 'QUERY_BUDGET_ENABLED', settings.DEBUG)
+# Default queries allowed per request when the view doesn't declare one
+DEFAULT_QUERY_BUDGET = getattr(settings, 'QUERY_BUDGET', 50)
+# A shape run this many times in one request is reported as a likely N+1
+REPEAT_THRESHOLD = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def query_shape(sql):
+    """Parametrized SQL with whitespace normalized and IN (%s, %s, ...) collapsed."""
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', sql).strip())
+
+
+def query_budget(limit):
+    """Declare how many queries a view may run, e.g. @query_budget(10)."""
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+class QueryCounter:
+    """
+    Context manager counting the queries run on every database connection
+    in this thread, grouped by shape.
+    """
+
+    def __init__(self):
+        self.shapes = Counter()
+        self.elapsed = 0.0
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.monotonic() - started
+            self.shapes[query_shape(sql)] += 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc):
+        self._stack.close()
+
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        """(shape, times) pairs run at least `threshold` times, worst first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+
+        request.query_budget = DEFAULT_QUERY_BUDGET
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+
+        # Streaming responses keep querying after this returns; only the view itself is counted
+        budget = request.query_budget
+        repeated = counter.repeated()
+        response['X-Query-Count'] = str(counter.count)
+        response['X-Query-Budget'] = str(budget)
+        if repeated:
+            response['X-Query-Repeated'] = ', '.join(f'{n}x' for _, n in repeated)
+
+        over = counter.count > budget
+        level = logging.WARNING if over or repeated else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(
+                level,
+                '%s %s: %d queries (budget %d%s) in %.1fms%s',
+                request.method,
+                request.path,
+                counter.count,
+                budget,
+                ', OVER' if over else '',
+                counter.elapsed * 1000,
+                ''.join(f'\n  {n}x {shape}' for shape, n in repeated),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if QUERY_BUDGET_ENABLED:
+            request.query_budget = getattr(view_func, 'query_budget', DEFAULT_QUERY_BUDGET)
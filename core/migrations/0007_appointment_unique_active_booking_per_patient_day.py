@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_appointment_counselor_notes_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(models.F('patient'), models.Case(models.When(status='cancelled', then=None), default='date', output_field=models.DateField()), name='unique_active_booking_per_patient_day'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_appointment_unique_active_booking_per_patient_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='core.availability'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_waitlistentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['counselor', 'date', 'start_time', 'id'], name='availability_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_appointment_appointment_date_time_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('started', 'Started'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('missed', 'Missed'), ('expired', 'Expired')], default='Pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_next_open_slot_at'),
+        ('core', '0016_archivedappointment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounselorStats',
+            fields=[
+                ('counselor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('patients', models.IntegerField(default=0)),
+                ('sessions', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('delivered_minutes', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
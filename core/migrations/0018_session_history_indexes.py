@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_counselorstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedappointment',
+            name='archive_patient_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedappointment',
+            name='archive_counselor_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'date', 'time', 'id'], name='appointment_patient_hist_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['counselor', 'date', 'time', 'id'], name='appointment_counselor_hist_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['patient', 'date', 'time', 'id'], name='archive_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['counselor', 'date', 'time', 'id'], name='archive_counselor_date_idx'),
+        ),
+    ]
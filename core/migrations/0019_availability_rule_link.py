@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_session_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availability',
+            name='rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='slots', to='core.availabilityrule'),
+        ),
+    ]
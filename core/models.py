@@ -1,7 +1,8 @@
 from django.db import models
+from django.db.models import Case, Exists, F, OuterRef, Q, When
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.utils.timezone import localdate
+from django.utils.timezone import localdate, localtime
 
 User = get_user_model()
 
@@ -15,12 +16,32 @@ WEEKDAYS = [
     ("Sunday", "Sunday"),
 ]
 
+# Counselor specializations offered on the registration/profile forms
+SPECIALIZATIONS = [
+    "Anxiety & Stress",
+    "Depression & Mood",
+    "Relationship Issues",
+    "Trauma & PTSD",
+    "Grief & Loss",
+    "Self-Esteem",
+    "Life Transitions",
+    "Work Stress",
+    "Financial Stress",
+    "Academic Pressure",
+    "Parenting",
+    "Anger Management",
+    "Mindfulness",
+    "Other Mild Concerns",
+]
+
 class Appointment(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('started', 'Started'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
+        ('missed', 'Missed'),      # never started; set by sweep_lifecycle
+        ('expired', 'Expired'),    # started but never ended; set by sweep_lifecycle
     ]
      
     patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='appointments')
@@ -28,14 +49,55 @@ class Appointment(models.Model):
     date = models.DateField()
     time = models.TimeField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # bulk .update() calls must set this too (calendar sync)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')  # e.g., Scheduled, Completed, Cancelled
     google_meet_link = models.URLField(blank=True, null=True)
     counselor_notes = models.TextField(blank=True, null=True)
+    slot = models.ForeignKey('Availability', on_delete=models.SET_NULL, null=True, blank=True, related_name='appointments')
+
+    class Meta:
+        constraints = [
+            # One active booking per patient per day. Cancelled rows map to NULL
+            # so they never block a rebooking (MySQL has no partial indexes).
+            models.UniqueConstraint(
+                'patient',
+                Case(When(status='cancelled', then=None), default='date', output_field=models.DateField()),
+                name='unique_active_booking_per_patient_day',
+            ),
+        ]
+        indexes = [
+            # Range scans by start time (reminders, sweeps)
+            models.Index(fields=['date', 'time'], name='appointment_date_time_idx'),
+            # Keyset pagination of session history (see core.services.session_history)
+            models.Index(fields=['patient', 'date', 'time', 'id'], name='appointment_patient_hist_idx'),
+            models.Index(fields=['counselor', 'date', 'time', 'id'], name='appointment_counselor_hist_idx'),
+        ]
 
     def __str__(self):
         return f"{self.patient.full_name} with {self.counselor.full_name} on {self.date} at {self.time}"
 
 
+class AvailabilityQuerySet(models.QuerySet):
+    def upcoming(self):
+        return self.filter(date__gte=localdate())
+
+    def not_started(self):
+        now = localtime()
+        return self.filter(Q(date__gt=now.date()) | Q(date=now.date(), start_time__gte=now.time()))
+
+    def exclude_vacation(self):
+        # Overlay of the counselor's VacationPeriods; the slots themselves are left alone
+        return self.exclude(Exists(VacationPeriod.objects.filter(
+            counselor_id=OuterRef('counselor_id'),
+            start_date__lte=OuterRef('date'),
+            end_date__gte=OuterRef('date'),
+        )))
+
+    def with_open_seats(self):
+        # Pushes the "seats left" check into SQL instead of filtering in Python
+        return self.annotate(available_slots=F('total_slots') - F('booked_slots')).filter(available_slots__gt=0)
+
+
 class Availability(models.Model):
     counselor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='availabilities')
     weekday = models.CharField(max_length=10, choices=WEEKDAYS, blank=True)
@@ -45,10 +107,18 @@ class Availability(models.Model):
     is_vacation = models.BooleanField(default=False)
     total_slots = models.IntegerField(default=1)   # <-- add this
     booked_slots = models.IntegerField(default=0)
+    # Set when the row was materialized from a recurring rule (hand-made slots have none)
+    rule = models.ForeignKey('AvailabilityRule', null=True, blank=True, on_delete=models.SET_NULL, related_name='slots')
+
+    objects = AvailabilityQuerySet.as_manager()
 
     class Meta:
         unique_together = ('counselor', 'date', 'start_time', 'end_time')
         ordering = ['date', 'start_time']
+        indexes = [
+            # Keyset pagination of a counselor's slots (see get_availability)
+            models.Index(fields=['counselor', 'date', 'start_time', 'id'], name='availability_keyset_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # auto-compute weekday from date
@@ -56,4 +126,123 @@ class Availability(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.counselor.full_name} available on {self.date} from {self.start_time} to {self.end_time}"
\ No newline at end of file
+        return f"{self.counselor.full_name} available on {self.date} from {self.start_time} to {self.end_time}"
+
+class AvailabilityRule(models.Model):
+    """A recurring weekly slot; concrete Availability rows are materialized from it for a rolling window."""
+    counselor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='availability_rules')
+    weekday = models.CharField(max_length=10, choices=WEEKDAYS)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    total_slots = models.IntegerField(default=1)
+    materialized_through = models.DateField(null=True, blank=True)  # last date already turned into Availability rows
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('counselor', 'weekday', 'start_time', 'end_time')
+        ordering = ['counselor', 'weekday', 'start_time']
+
+    def __str__(self):
+        return f"{self.counselor.full_name} every {self.weekday} from {self.start_time} to {self.end_time}"
+
+
+class WaitlistEntry(models.Model):
+    """A patient waiting for a seat in a full slot; promoted in FIFO order when a booking is cancelled."""
+    slot = models.ForeignKey(Availability, on_delete=models.CASCADE, related_name='waitlist')
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('slot', 'patient')
+        ordering = ['created_at', 'id']
+
+    def __str__(self):
+        return f"{self.patient.full_name} waiting for slot {self.slot_id}"
+
+
+class VacationPeriod(models.Model):
+    """
+    Dates a counselor is away (inclusive). Slots in the range are hidden
+    from patients by AvailabilityQuerySet.exclude_vacation() rather than
+    deleted, so ending a vacation brings them straight back.
+    """
+    counselor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='vacations')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['counselor', 'start_date', 'end_date'], name='vacation_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.counselor.full_name} away {self.start_date} to {self.end_date}"
+
+
+class CounselorStats(models.Model):
+    """
+    Running totals for the counselor dashboard, updated in the same
+    transaction as each booking/cancel/complete (core.services.record_counselor_stats).
+    `manage.py rebuild_counselor_stats` recomputes them from scratch.
+    """
+    counselor = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    patients = models.IntegerField(default=0)           # distinct patients with a completed session
+    sessions = models.IntegerField(default=0)           # booked and not cancelled
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    delivered_minutes = models.IntegerField(default=0)  # completed sessions, from slot durations
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.counselor.full_name}"
+
+    @property
+    def delivered_hours(self):
+        return round(self.delivered_minutes / 60, 1)
+
+
+class ArchivedAppointment(models.Model):
+    """
+    Finished appointments moved out of the hot Appointment table by
+    `manage.py archive_appointments`. Keeps the original id (so calendar
+    UIDs stay stable) and the slot's end time, since old slots get pruned.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_appointments')
+    counselor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_counselor_appointments')
+    date = models.DateField()
+    time = models.TimeField()
+    end_time = models.TimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    google_meet_link = models.URLField(blank=True, null=True)
+    counselor_notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'date', 'time', 'id'], name='archive_patient_date_idx'),
+            models.Index(fields=['counselor', 'date', 'time', 'id'], name='archive_counselor_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient.full_name} with {self.counselor.full_name} on {self.date} at {self.time} (archived)"
+
+    @classmethod
+    def from_appointment(cls, appointment):
+        return cls(
+            id=appointment.id,
+            patient_id=appointment.patient_id,
+            counselor_id=appointment.counselor_id,
+            date=appointment.date,
+            time=appointment.time,
+            end_time=appointment.slot.end_time if appointment.slot_id else None,
+            status=appointment.status,
+            google_meet_link=appointment.google_meet_link,
+            counselor_notes=appointment.counselor_notes,
+            created_at=appointment.created_at,
+            updated_at=appointment.updated_at,
+        )
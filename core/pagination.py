@@ -0,0 +1,52 @@
+# core/pagination.py
+#
+# Keyset ("cursor") pagination helpers. A cursor is the ordering key of the
+# last row on the previous page, so every page is an index range scan that
+# costs the same no matter how deep the client has paged.
+
+import base64
+import json
+from datetime import date, datetime, time
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    """Opaque, URL-safe token for a tuple of date/time/int ordering values."""
+    raw = [v.isoformat() if isinstance(v, (date, time)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, *types):
+    """Reverse of encode_cursor; `types` are the expected value types, e.g. (date, time, int)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(raw) != len(types):
+            raise ValueError
+        return tuple(
+            t.fromisoformat(v) if t in (date, datetime, time) else t(v)
+            for t, v in zip(types, raw)
+        )
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def keyset_filter(fields, values, descending=False):
+    """
+    Q object selecting rows strictly after `values` in the (fields...) order,
+    e.g. fields=('date', 'start_time', 'id') gives
+    date > d OR (date = d AND start_time > t) OR (date = d AND start_time = t AND id > i).
+    """
+    op = 'lt' if descending else 'gt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f'{field}__{op}': values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            step &= Q(**{prev_field: prev_value})
+        condition |= step
+    return condition
@@ -0,0 +1,745 @@
+# core/services.py
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from itertools import accumulate
+import calendar
+from datetime import date, datetime, time as dt_time, timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from django.utils.timezone import localdate
+
+from .availability_index import availability_index
+from .matching import matching_engine
+from .models import (
+    Appointment, ArchivedAppointment, Availability, AvailabilityRule, CounselorStats, VacationPeriod,
+    WaitlistEntry,
+)
+from .ics import DEFAULT_SESSION_MINUTES
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+
+User = get_user_model()
+
+
+# Cached open-slot payload per counselor (see counselor_open_slots)
+AVAILABILITY_CACHE_TIMEOUT = 60 * 15
+
+# How far ahead recurring rules are turned into concrete Availability rows
+AVAILABILITY_WINDOW_DAYS = getattr(settings, 'AVAILABILITY_WINDOW_DAYS', 28)
+
+# How long a seat picked in the booking flow stays reserved for the patient
+SLOT_HOLD_SECONDS = getattr(settings, 'SLOT_HOLD_SECONDS', 300)
+
+# Sessions per page in the history views (past sessions, patient records)
+HISTORY_PAGE_SIZE = 20
+
+
+class BookingError(Exception):
+    """Raised when a booking cannot be made; the message is safe to show to the patient."""
+
+
+class SlotFullError(BookingError):
+    """The slot exists but has no seats left (the patient may join its waitlist)."""
+
+
+def book_slot(patient, counselor, slot_id):
+    """
+    Book one seat in an Availability slot for a patient.
+
+    The seat is claimed with a single conditional UPDATE, so two requests
+    can never both take the last seat. Seats held by other patients (see
+    place_hold) are kept out of reach, and the patient's own hold is turned
+    into the booking. The Appointment insert runs in the same transaction
+    and the patient/day constraint rolls the seat back if the patient
+    already has a booking that day.
+
+    Holds are read without the hold lock, so a booking never waits on other
+    bookings; the lock is only taken to drop the patient's own hold after
+    the seat is claimed.
+    """
+    holds = _active_holds(slot_id)
+    held_by_others = len(holds) - (1 if patient.id in holds else 0)
+    try:
+        with transaction.atomic():
+            claimed = Availability.objects.filter(
+                id=slot_id,
+                counselor=counselor,
+                booked_slots__lt=F('total_slots') - held_by_others,
+            ).exclude_vacation().update(booked_slots=F('booked_slots') + 1)
+
+            if not claimed:
+                slots = Availability.objects.filter(id=slot_id, counselor=counselor)
+                if not slots.exists():
+                    raise BookingError('Slot not found')
+                if not slots.exclude_vacation().exists():
+                    raise BookingError('The counselor is away on that date')
+                raise SlotFullError('This slot is fully booked')
+
+            slot = Availability.objects.get(id=slot_id)
+            availability_changed(counselor.id)
+            calendar_changed(patient.id)
+            appointment = Appointment.objects.create(
+                patient=patient,
+                counselor=counselor,
+                slot=slot,
+                date=slot.date,
+                time=slot.start_time,
+            )
+            record_counselor_stats(counselor.id, sessions=1)
+    except IntegrityError:
+        raise BookingError('Sorry! You can only book once per day')
+
+    if patient.id in holds:
+        release_hold(patient, slot_id)
+    return appointment
+
+
+def cancel_appointment(appointment):
+    """
+    Cancel an appointment and give its seat back to the slot.
+
+    The row is kept with status 'cancelled' so history keeps its slot link.
+    If somebody is on the slot's waitlist the seat goes straight to them in
+    the same transaction (booked_slots stays the same); otherwise it is
+    returned with one atomic decrement. Only pending appointments can be
+    cancelled; returns False for anything else (already cancelled, started,
+    completed, missed or expired), so the stats deltas always match.
+    """
+    with transaction.atomic():
+        cancelled = (
+            Appointment.objects.filter(id=appointment.id, status__iexact='pending')
+            .update(status='cancelled', updated_at=timezone.now())
+        )
+        if not cancelled:
+            return False
+
+        promoted = None
+        if appointment.slot_id:
+            promoted = promote_from_waitlist(appointment.slot_id)
+            if promoted is None:
+                Availability.objects.filter(id=appointment.slot_id, booked_slots__gt=0).update(
+                    booked_slots=F('booked_slots') - 1
+                )
+        # Same lock order as book_slot: slot, counselor row, then stats
+        availability_changed(appointment.counselor_id)
+        record_counselor_stats(appointment.counselor_id, sessions=0 if promoted else -1, cancelled=1)
+        calendar_changed(appointment.patient_id)
+
+    appointment.status = 'cancelled'
+    return True
+
+
+def promote_from_waitlist(slot_id):
+    """
+    Hand a freed seat to the first waiter who can still take it. Must run
+    inside the caller's transaction; returns the new Appointment or None.
+    The caller records the counselor stats for the new booking.
+    The patient is notified over their `user_<id>` channel group on commit.
+    """
+    # Row lock serializes concurrent cancels on the same slot. Slots inside
+    # a vacation are hidden everywhere else, so nobody is promoted into one.
+    slot = (
+        Availability.objects.select_for_update().select_related('counselor')
+        .filter(id=slot_id).exclude_vacation().first()
+    )
+    if slot is None:
+        return None
+    entries = list(WaitlistEntry.objects.filter(slot_id=slot_id).order_by('created_at', 'id')[:20])
+    for entry in entries:
+        entry.delete()
+        try:
+            with transaction.atomic():
+                appointment = Appointment.objects.create(
+                    patient_id=entry.patient_id,
+                    counselor_id=slot.counselor_id,
+                    slot=slot,
+                    date=slot.date,
+                    time=slot.start_time,
+                )
+        except IntegrityError:
+            continue  # already booked elsewhere that day; try the next waiter
+
+        calendar_changed(entry.patient_id)
+        transaction.on_commit(lambda: notify_waitlist_promotion(appointment, slot))
+        return appointment
+    return None
+
+
+def notify_waitlist_promotion(appointment, slot):
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f"user_{appointment.patient_id}",
+        {
+            "type": "waitlist_promoted",  # maps to consumer.waitlist_promoted
+            "appointment_id": appointment.id,
+            "counselor_name": slot.counselor.full_name,
+            "date": slot.date.strftime("%Y-%m-%d"),
+            "time": slot.start_time.strftime("%I:%M %p"),
+        }
+    )
+
+
+def join_waitlist(patient, slot_id):
+    """Queue a patient for a full slot. Returns (entry, position)."""
+    slot = Availability.objects.filter(id=slot_id).exclude_vacation().first()
+    if slot is None:
+        if Availability.objects.filter(id=slot_id).exists():
+            raise BookingError('The counselor is away on that date')
+        raise BookingError('Slot not found')
+    # Seats held by other patients count as taken, matching book_slot
+    holds = _active_holds(slot_id)
+    held_by_others = len(holds) - (1 if patient.id in holds else 0)
+    if slot.booked_slots + held_by_others < slot.total_slots:
+        raise BookingError('This slot still has seats; book it instead')
+    if Appointment.objects.filter(patient=patient, date=slot.date).exclude(status='cancelled').exists():
+        raise BookingError('Sorry! You can only book once per day')
+
+    entry, _ = WaitlistEntry.objects.get_or_create(slot=slot, patient=patient)
+    position = WaitlistEntry.objects.filter(slot=slot, id__lte=entry.id).count()
+    return entry, position
+
+
+def complete_appointment(appointment, notes=''):
+    """
+    Mark a pending or started session as completed and store the
+    counselor's notes; a completed one only gets its notes updated. The
+    counselor's stats are only bumped on the first transition to completed.
+    Returns False for cancelled, missed or expired appointments.
+    """
+    with transaction.atomic():
+        rows = Appointment.objects.filter(id=appointment.id)
+        newly_completed = rows.filter(Q(status__iexact='pending') | Q(status='started')).update(
+            status='completed', counselor_notes=notes, updated_at=timezone.now()
+        )
+        if newly_completed:
+            pair = {'counselor_id': appointment.counselor_id, 'patient_id': appointment.patient_id}
+            first_with_patient = not (
+                Appointment.objects.filter(status='completed', **pair).exclude(id=appointment.id).exists()
+                or ArchivedAppointment.objects.filter(status='completed', **pair).exists()
+            )
+            record_counselor_stats(
+                appointment.counselor_id,
+                completed=1,
+                patients=1 if first_with_patient else 0,
+                delivered_minutes=session_minutes(appointment),
+            )
+        elif not rows.filter(status='completed').update(counselor_notes=notes, updated_at=timezone.now()):
+            return False
+        calendar_changed(appointment.patient_id, appointment.counselor_id)
+
+    appointment.status = 'completed'
+    appointment.counselor_notes = notes
+    return True
+
+
+def session_minutes(appointment):
+    """Length of a session from its slot, or the default session length."""
+    if appointment.slot_id and appointment.slot.end_time > appointment.time:
+        start = datetime.combine(appointment.date, appointment.time)
+        return int((datetime.combine(appointment.date, appointment.slot.end_time) - start).total_seconds() // 60)
+    return DEFAULT_SESSION_MINUTES
+
+
+# -----------------------------
+# COUNSELOR STATS
+# -----------------------------
+
+def record_counselor_stats(counselor_id, **deltas):
+    """
+    Apply +/- deltas (e.g. sessions=1) to the counselor's CounselorStats
+    row with one UPDATE ... SET col = col + n, in the caller's transaction.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if CounselorStats.objects.filter(counselor_id=counselor_id).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            CounselorStats.objects.create(counselor_id=counselor_id, **deltas)
+    except IntegrityError:
+        # Someone else created the row first
+        CounselorStats.objects.filter(counselor_id=counselor_id).update(**changes)
+
+
+# -----------------------------
+# SLOT HOLDS
+# -----------------------------
+# Holds live in the cache as {patient_id: expires_at} per slot. Expired
+# entries are swept whenever the dict is read, and the whole key expires
+# with its last hold. Changes are serialized with a short cache.add() lock.
+
+def _slot_holds_key(slot_id):
+    return f"slot_holds_{slot_id}"
+
+
+@contextmanager
+def _slot_hold_lock(slot_id, wait=2.0):
+    key = f"slot_holds_lock_{slot_id}"
+    deadline = time.monotonic() + wait
+    while not cache.add(key, 1, timeout=10):
+        if time.monotonic() > deadline:
+            raise BookingError('This slot is busy, please try again')
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def _sweep(holds, now=None):
+    now = now or time.time()
+    return {patient_id: expires for patient_id, expires in holds.items() if expires > now}
+
+
+def _active_holds(slot_id):
+    return _sweep(cache.get(_slot_holds_key(slot_id)) or {})
+
+
+def _save_holds(slot_id, holds):
+    if holds:
+        cache.set(_slot_holds_key(slot_id), holds, max(1, int(max(holds.values()) - time.time()) + 1))
+    else:
+        cache.delete(_slot_holds_key(slot_id))
+
+
+def place_hold(patient, slot_id):
+    """
+    Reserve a seat for SLOT_HOLD_SECONDS while the patient confirms.
+    Calling it again refreshes the patient's existing hold. Returns the
+    expiry timestamp; raises SlotFullError when booked + held seats are full
+    and BookingError when the patient already has a session that day.
+    """
+    with _slot_hold_lock(slot_id):
+        slot = Availability.objects.filter(id=slot_id).exclude_vacation().only('date', 'total_slots', 'booked_slots').first()
+        if slot is None:
+            raise BookingError('Slot not found')
+        # The booking would fail on the once-per-day rule; don't block a seat for it
+        if Appointment.objects.filter(patient=patient, date=slot.date).exclude(status='cancelled').exists():
+            raise BookingError('Sorry! You can only book once per day')
+
+        holds = _active_holds(slot_id)
+        if patient.id not in holds and slot.booked_slots + len(holds) >= slot.total_slots:
+            raise SlotFullError('This slot is fully booked')
+
+        holds[patient.id] = time.time() + SLOT_HOLD_SECONDS
+        _save_holds(slot_id, holds)
+        return holds[patient.id]
+
+
+def release_hold(patient, slot_id):
+    with _slot_hold_lock(slot_id):
+        holds = _active_holds(slot_id)
+        if holds.pop(patient.id, None) is not None:
+            _save_holds(slot_id, holds)
+
+
+def held_seats(slot_ids, exclude_patient_id=None):
+    """{slot_id: seats held by other patients} with a single cache read."""
+    now = time.time()
+    keys = {_slot_holds_key(slot_id): slot_id for slot_id in slot_ids}
+    counts = {}
+    for key, holds in cache.get_many(keys).items():
+        active = _sweep(holds, now)
+        active.pop(exclude_patient_id, None)
+        if active:
+            counts[keys[key]] = len(active)
+    return counts
+
+
+def apply_holds(slots, viewer_id=None):
+    """Subtract other patients' holds from serialized slots and drop the ones with nothing left."""
+    held = held_seats([slot["id"] for slot in slots], exclude_patient_id=viewer_id)
+    if not held:
+        return slots
+    adjusted = []
+    for slot in slots:
+        available = slot["available_slots"] - held.get(slot["id"], 0)
+        if available > 0:
+            adjusted.append({**slot, "available_slots": available, "held_slots": held.get(slot["id"], 0)})
+    return adjusted
+
+
+# -----------------------------
+# OPEN-SLOT CACHE
+# -----------------------------
+
+def _open_slots_cache_key(counselor_id):
+    # Keyed by day so yesterday's slots drop out without an explicit purge
+    return f"counselor_availability_{counselor_id}_{localdate().isoformat()}"
+
+
+def serialize_slot(slot):
+    """JSON shape used by the availability endpoints; accepts a model or a .values() dict."""
+    get = slot.get if isinstance(slot, dict) else lambda field: getattr(slot, field)
+    return {
+        "id": get("id"),
+        "weekday": get("weekday"),
+        "date": get("date").strftime("%Y-%m-%d"),
+        "start_time": get("start_time").strftime("%I:%M %p"),
+        "end_time": get("end_time").strftime("%I:%M %p"),
+        "total_slots": get("total_slots"),
+        "booked_slots": get("booked_slots"),
+        "available_slots": get("total_slots") - get("booked_slots"),
+    }
+
+
+def counselor_open_slots(counselor_id):
+    """Upcoming slots with seats left for one counselor, served from cache when possible."""
+    return open_slots_for_counselors([counselor_id])[counselor_id]
+
+
+def open_slots_for_counselors(counselor_ids):
+    """
+    Batched version of counselor_open_slots: {counselor_id: [slot, ...]}.
+
+    Cached counselors come from one get_many; the rest are loaded with a
+    single query, grouped in Python and written back with set_many.
+    """
+    counselor_ids = list(dict.fromkeys(int(cid) for cid in counselor_ids))
+    keys = {_open_slots_cache_key(cid): cid for cid in counselor_ids}
+    cached = cache.get_many(keys)
+    result = {keys[key]: data for key, data in cached.items()}
+
+    missing = [cid for cid in counselor_ids if cid not in result]
+    if missing:
+        materialize_rules(missing)
+        grouped = {cid: [] for cid in missing}
+        slots = (
+            Availability.objects.filter(counselor_id__in=missing)
+            .upcoming()
+            .exclude_vacation()
+            .with_open_seats()
+            .order_by('date', 'start_time')
+            .values('id', 'counselor_id', 'weekday', 'date', 'start_time', 'end_time', 'total_slots', 'booked_slots')
+        )
+        for slot in slots:
+            grouped[slot['counselor_id']].append(serialize_slot(slot))
+        cache.set_many({_open_slots_cache_key(cid): data for cid, data in grouped.items()}, AVAILABILITY_CACHE_TIMEOUT)
+        result.update(grouped)
+
+    return result
+
+
+def next_open_slot_start(counselor_id):
+    """Start of the counselor's soonest slot that still has a seat, or None."""
+    slot = (
+        Availability.objects.filter(counselor_id=counselor_id)
+        .not_started()
+        .exclude_vacation()
+        .with_open_seats()
+        .order_by('date', 'start_time')
+        .values_list('date', 'start_time')
+        .first()
+    )
+    return timezone.make_aware(datetime.combine(*slot)) if slot else None
+
+
+def availability_changed(counselor_id):
+    """
+    Call after any write to a counselor's slots or bookings. Updates the
+    counselor's next_open_slot_at in the caller's transaction and drops
+    cached availability on commit.
+    """
+    User.objects.filter(id=counselor_id).update(next_open_slot_at=next_open_slot_start(counselor_id))
+
+    def _invalidate():
+        cache.delete(_open_slots_cache_key(counselor_id))
+        availability_index.mark_dirty(counselor_id)
+        matching_engine.mark_dirty(counselor_id)
+    transaction.on_commit(_invalidate)
+    calendar_changed(counselor_id)
+
+
+def counselor_profile_changed(counselor_id):
+    """Call after a counselor edits their profile (name, specializations, experience)."""
+    def _invalidate():
+        availability_index.mark_dirty(counselor_id)
+        matching_engine.mark_dirty(counselor_id)
+    transaction.on_commit(_invalidate)
+
+
+# -----------------------------
+# MONTH CALENDAR
+# -----------------------------
+# Rollups are cached under a per-user version number; any write bumps the
+# version so every cached month for that user goes stale at once. The
+# dashboards below are keyed on the same version.
+
+def _calendar_version_key(user_id):
+    return f"calendar_version_{user_id}"
+
+
+def _user_data_version(user_id):
+    # A fresh version is time-based so it can never collide with stale entries
+    return cache.get_or_set(_calendar_version_key(user_id), lambda: int(time.time() * 1000), None)
+
+
+def calendar_changed(*user_ids):
+    """Bump the users' data version on commit (month calendars and dashboards)."""
+    def _bump():
+        for user_id in user_ids:
+            try:
+                cache.incr(_calendar_version_key(user_id))
+            except ValueError:
+                pass  # no version yet: the next read starts a fresh one
+    transaction.on_commit(_bump)
+
+
+def month_calendar(user, year, month):
+    """
+    Per-day rollup for one month: open/booked seats from Availability
+    (counselors only) and appointment counts by status, one GROUP BY each.
+    """
+    key = f"calendar_{user.id}_{_user_data_version(user.id)}_{year}_{month:02d}"
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    days = {}
+
+    def day(d):
+        return days.setdefault(d, {
+            "date": d.strftime("%Y-%m-%d"),
+            "open_seats": 0,
+            "booked_seats": 0,
+            "appointments": {},
+        })
+
+    if user.role == 'counselor':
+        seats = (
+            Availability.objects.filter(counselor=user, date__range=(first, last))
+            .values('date')
+            .annotate(total=Sum('total_slots'), booked=Sum('booked_slots'))
+            .order_by()
+        )
+        for row in seats:
+            entry = day(row['date'])
+            entry["open_seats"] = max(row['total'] - row['booked'], 0)
+            entry["booked_seats"] = row['booked']
+
+        away = VacationPeriod.objects.filter(counselor=user, start_date__lte=last, end_date__gte=first)
+        for vacation in away.values('start_date', 'end_date'):
+            d = max(vacation['start_date'], first)
+            while d <= min(vacation['end_date'], last):
+                entry = day(d)
+                entry["vacation"] = True
+                entry["open_seats"] = 0
+                d += timedelta(days=1)
+
+    owner = {'counselor': user} if user.role == 'counselor' else {'patient': user}
+    appointments = (
+        Appointment.objects.filter(date__range=(first, last), **owner)
+        .values('date', 'status')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for row in appointments:
+        counts = day(row['date'])["appointments"]
+        status = row['status'].lower()
+        counts[status] = counts.get(status, 0) + row['n']
+
+    data = {"year": year, "month": month, "days": [days[d] for d in sorted(days)]}
+    cache.set(key, data, 60 * 60)
+    return data
+
+
+# -----------------------------
+# DASHBOARDS
+# -----------------------------
+# A dashboard payload is cached per user under their data version (see
+# calendar_changed), the wellness tips version and today's date, so any
+# booking change or new tip shows up on the next load.
+
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+_WELLNESS_TIPS_VERSION_KEY = "wellness_tips_version"
+
+
+def wellness_tips_changed():
+    def _bump():
+        try:
+            cache.incr(_WELLNESS_TIPS_VERSION_KEY)
+        except ValueError:
+            pass
+    transaction.on_commit(_bump)
+
+
+def cached_dashboard(user, build):
+    """Return build()'s dict from the cache, building it on a miss."""
+    tips_version = cache.get_or_set(_WELLNESS_TIPS_VERSION_KEY, lambda: int(time.time() * 1000), None)
+    key = f"dashboard_{user.id}_{_user_data_version(user.id)}_{tips_version}_{localdate()}"
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+# -----------------------------
+# RECURRING RULES
+# -----------------------------
+
+def materialize_rules(counselor_ids=None, until=None):
+    """
+    Turn recurring AvailabilityRules into Availability rows up to `until`
+    (default: today + AVAILABILITY_WINDOW_DAYS).
+
+    Only rules that are behind the window are loaded, so once a calendar
+    is current this is a single cheap SELECT. Dates where a generated row
+    would overlap an existing slot (or another rule's row) are skipped via
+    find_overlapping, so hand-made slots are left alone; the rest go in with
+    one bulk_create. Returns the number of rows created.
+    """
+    today = localdate()
+    until = until or today + timedelta(days=AVAILABILITY_WINDOW_DAYS)
+
+    rules = AvailabilityRule.objects.filter(
+        Q(materialized_through__isnull=True) | Q(materialized_through__lt=until)
+    )
+    if counselor_ids is not None:
+        rules = rules.filter(counselor_id__in=counselor_ids)
+    rules = list(rules)
+    if not rules:
+        return 0
+
+    new_slots = []
+    for rule in rules:
+        day = today
+        if rule.materialized_through and rule.materialized_through >= today:
+            day = rule.materialized_through + timedelta(days=1)
+        while day <= until:
+            # bulk_create skips Availability.save(), so weekday is set here
+            weekday = day.strftime('%A')
+            if weekday == rule.weekday:
+                new_slots.append(Availability(
+                    counselor_id=rule.counselor_id,
+                    rule=rule,
+                    weekday=weekday,
+                    date=day,
+                    start_time=rule.start_time,
+                    end_time=rule.end_time,
+                    total_slots=rule.total_slots,
+                ))
+            day += timedelta(days=1)
+
+    by_counselor = {}
+    for slot in new_slots:
+        by_counselor.setdefault(slot.counselor_id, []).append(slot)
+    new_slots = []
+    for counselor_id, slots in by_counselor.items():
+        overlapping = find_overlapping(counselor_id, [(s.date, s.start_time, s.end_time) for s in slots])
+        new_slots += [slot for i, slot in enumerate(slots) if i not in overlapping]
+
+    with transaction.atomic():
+        Availability.objects.bulk_create(new_slots, ignore_conflicts=True)
+        AvailabilityRule.objects.filter(id__in=[r.id for r in rules]).update(materialized_through=until)
+        for counselor_id in {r.counselor_id for r in rules}:
+            availability_changed(counselor_id)
+
+    return len(new_slots)
+
+
+# -----------------------------
+# OVERLAP VALIDATION
+# -----------------------------
+
+def find_overlapping(counselor_id, new_slots):
+    """
+    Return the indexes of `new_slots` ((date, start_time, end_time) tuples)
+    that overlap an existing slot or an earlier new slot.
+
+    Existing slots are loaded with one query and sorted per day with a
+    running max of their end times, so each new interval is checked against
+    them with one bisect: it overlaps if any existing slot starting before
+    its end reaches past its start. The surviving new intervals are then
+    swept by start time, rejecting any that start before the furthest
+    accepted end.
+    """
+    if not new_slots:
+        return set()
+
+    existing_by_date = {}
+    existing = Availability.objects.filter(
+        counselor_id=counselor_id, date__in={d for d, _, _ in new_slots}
+    ).values_list('date', 'start_time', 'end_time')
+    for day, start, end in existing:
+        existing_by_date.setdefault(day, []).append((start, end))
+    new_by_date = {}
+    for index, (day, start, end) in enumerate(new_slots):
+        new_by_date.setdefault(day, []).append((start, index, end))
+
+    rejected = set()
+    for day, intervals in new_by_date.items():
+        taken = sorted(existing_by_date.get(day, []))
+        starts = [start for start, _ in taken]
+        reach = list(accumulate((end for _, end in taken), max))
+
+        accepted_end = None
+        for start, index, end in sorted(intervals):  # by start, then request order
+            i = bisect_left(starts, end)
+            if i and reach[i - 1] > start:
+                rejected.add(index)
+                continue
+            if accepted_end is not None and start < accepted_end:
+                rejected.add(index)
+                continue
+            accepted_end = end if accepted_end is None else max(accepted_end, end)
+    return rejected
+
+
+# -----------------------------
+# SESSION HISTORY
+# -----------------------------
+
+HISTORY_ORDER = ('date', 'time', 'id')
+
+
+def _history_page(queryset, after, limit):
+    queryset = queryset.select_related('patient', 'counselor').order_by('-date', '-time', '-id')
+    if after:
+        queryset = queryset.filter(keyset_filter(HISTORY_ORDER, after, descending=True))
+    return list(queryset[:limit + 1])
+
+
+def session_history(cursor=None, per_page=HISTORY_PAGE_SIZE, **owner):
+    """
+    One page of sessions for `owner` (e.g. patient=user), newest first, as
+    (sessions, next_cursor). Pages are keyset ranges on (date, time, id),
+    so a deep page costs the same as the first. They come from Appointment
+    until it runs out and then continue into ArchivedAppointment, so the
+    archive is only read when someone pages back that far. Both models
+    expose the same fields to templates. Raises InvalidCursor.
+    """
+    source, after = 'live', None
+    if cursor:
+        source, *after = decode_cursor(cursor, str, date, dt_time, int)
+        if source not in ('live', 'archive'):
+            raise InvalidCursor('Invalid cursor')
+
+    sessions = []
+    if source == 'live':
+        sessions = _history_page(Appointment.objects.filter(**owner), after, per_page)
+        if len(sessions) > per_page:
+            last = sessions[per_page - 1]
+            return sessions[:per_page], encode_cursor('live', last.date, last.time, last.id)
+        after = None  # the archive continues from its newest row
+
+    wanted = per_page - len(sessions)
+    archived = _history_page(ArchivedAppointment.objects.filter(**owner), after, wanted)
+    if len(archived) <= wanted:
+        return sessions + archived, None
+
+    page = sessions + archived[:wanted]
+    last = page[-1]
+    return page, encode_cursor('archive' if wanted else 'live', last.date, last.time, last.id)
@@ -0,0 +1,28 @@
+# core/signals.py
+#
+# Cache invalidation for writes that don't go through core.services
+# (admin edits, start_session's save(), WellnessTip changes). Bulk
+# .update() calls skip signals, so the services call calendar_changed
+# themselves.
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from admin_panel.models import WellnessTip
+from .models import Appointment, Availability
+from .services import calendar_changed, wellness_tips_changed
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def appointment_written(sender, instance, **kwargs):
+    calendar_changed(instance.patient_id, instance.counselor_id)
+
+
+@receiver([post_save, post_delete], sender=Availability)
+def availability_written(sender, instance, **kwargs):
+    calendar_changed(instance.counselor_id)
+
+
+@receiver([post_save, post_delete], sender=WellnessTip)
+def wellness_tip_written(sender, instance, **kwargs):
+    wellness_tips_changed()
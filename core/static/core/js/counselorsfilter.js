@@ -13,6 +13,17 @@ function filterCounselors() {
   });
 }
 
+// Sorting is done server-side (indexed next_open_slot_at), so reload with ?sort=
+function sortCounselors() {
+  const params = new URLSearchParams(window.location.search);
+  const sort = document.getElementById("sort").value;
+  if (sort) {
+    params.set("sort", sort);
+  } else {
+    params.delete("sort");
+  }
+  window.location.search = params.toString();
+}
 
 // Fetch available slots for a counselor
 async function fetchSlots(counselorId) {
@@ -26,24 +37,43 @@ async function fetchSlots(counselorId) {
   }
 }
 
-// Render slots in the counselor card
+// Fetch available slots for every counselor card in one request
+async function fetchAllSlots(counselorIds) {
+  try {
+    const res = await fetch(`/core/api/availability/counselors/?ids=${counselorIds.join(',')}`);
+    const data = await res.json();
+    return data.counselors || {};
+  } catch (err) {
+    console.error("Could not fetch slots", err);
+    return {};
+  }
+}
+
+// Latest slots per counselor id, filled by renderAllSlots
+let slotsByCounselor = {};
+
 // Render slots under each counselor with remaining slots
 async function renderAllSlots() {
-  document.querySelectorAll('.counselor-card').forEach(async card => {
-    const counselorId = card.querySelector('.book-btn').dataset.id;
+  const cards = Array.from(document.querySelectorAll('.counselor-card'));
+  const counselorIds = cards.map(card => card.querySelector('.book-btn').dataset.id);
+  if (counselorIds.length === 0) return;
+
+  slotsByCounselor = await fetchAllSlots(counselorIds);
+
+  counselorIds.forEach(counselorId => {
     const slotList = document.getElementById(`slots-${counselorId}`);
-    
-    const slots = await fetchSlots(counselorId);
-    
+    if (!slotList) return;
+
+    const slots = slotsByCounselor[counselorId] || [];
     if (slots.length === 0) {
       slotList.innerHTML = '<li>No available slots</li>';
       return;
     }
-    
+
     slotList.innerHTML = ''; // Clear previous slots
-    
+
     slots.forEach(slot => {
-      const remaining = slot.total_slots - slot.booked_slots;
+      const remaining = slot.available_slots;
       const li = document.createElement('li');
       li.textContent = `${slot.weekday} ${slot.start_time} - ${slot.end_time} (${remaining} slots left)`;
       slotList.appendChild(li);
@@ -51,10 +81,30 @@ async function renderAllSlots() {
   });
 }
 
+// Full slot: offer the waitlist; the seat is handed over automatically if one frees up
+async function offerWaitlist(slotId, message) {
+  const result = await Swal.fire({
+    title: 'Slot is full',
+    text: `${message} Join the waitlist and you'll be booked automatically if a seat opens up.`,
+    icon: 'info',
+    showCancelButton: true,
+    confirmButtonText: 'Join Waitlist'
+  });
+  if (!result.isConfirmed) return;
+
+  const res = await fetch(`/core/api/availability/${slotId}/waitlist/`, { method: 'POST' });
+  const data = await res.json();
+  if (data.success) {
+    Swal.fire('On the waitlist', `You are number ${data.position} in line for this slot.`, 'success');
+  } else {
+    Swal.fire('Error', data.error || 'Could not join the waitlist.', 'error');
+  }
+}
+
 // Booking popup
 $('.book-btn').click(async function() {
   const counselorId = $(this).data('id');
-  const slots = await fetchSlots(counselorId);
+  const slots = slotsByCounselor[counselorId] || await fetchSlots(counselorId);
 
   if (slots.length === 0) {
     Swal.fire('No slots available', 'This counselor currently has no available time slots.', 'info');
@@ -63,7 +113,7 @@ $('.book-btn').click(async function() {
 
   // Build options for select, disable full slots
   const slotOptions = slots.map(s => {
-    const remaining = s.total_slots - s.booked_slots;
+    const remaining = s.available_slots;
     return `<option value="${s.id}" ${remaining <= 0 ? 'disabled' : ''}>
               ${s.weekday} ${s.start_time} - ${s.end_time} (${remaining} left)
             </option>`;
@@ -81,14 +131,40 @@ $('.book-btn').click(async function() {
       if (!slotId) Swal.showValidationMessage(`Please select a slot`);
       return { slot_id: slotId };
     }
-  }).then(result => {
+  }).then(async result => {
     if (!result.isConfirmed) return;
+    const slotId = result.value.slot_id;
+
+    // Reserve the seat first so the confirm step can't lose it to another patient
+    const holdRes = await fetch(`/core/api/availability/${slotId}/hold/`, { method: 'POST' });
+    const hold = await holdRes.json();
+    if (!hold.success) {
+      if (hold.can_join_waitlist) {
+        offerWaitlist(slotId, hold.error);
+      } else {
+        Swal.fire('Error', hold.error || 'Could not reserve this slot.', 'error');
+      }
+      renderAllSlots();
+      return;
+    }
+
+    const confirmResult = await Swal.fire({
+      title: 'Confirm Booking',
+      text: `This seat is held for you for ${Math.floor(hold.expires_in / 60)} minutes.`,
+      icon: 'question',
+      showCancelButton: true,
+      confirmButtonText: 'Confirm'
+    });
+    if (!confirmResult.isConfirmed) {
+      fetch(`/core/api/availability/${slotId}/hold/release/`, { method: 'POST' });
+      return;
+    }
 
     $.ajax({
       url: `/core/book/${counselorId}/`,
       type: 'POST',
       data: {
-        'slot_id': result.value.slot_id,
+        'slot_id': slotId,
         'csrfmiddlewaretoken': '{{ csrf_token }}'
       },
       success: function(response) {
@@ -96,8 +172,15 @@ $('.book-btn').click(async function() {
         renderAllSlots(); // Refresh slots
       },
       error: function(xhr) {
+        // Don't leave the seat blocked for other patients until the hold expires
+        fetch(`/core/api/availability/${slotId}/hold/release/`, { method: 'POST' });
         const msg = xhr.responseJSON?.error || 'Something went wrong. Please try again.';
-        Swal.fire('Error', msg, 'error');
+        if (xhr.responseJSON?.can_join_waitlist) {
+          offerWaitlist(slotId, msg);
+        } else {
+          Swal.fire('Error', msg, 'error');
+        }
+        renderAllSlots();
       }
     });
   });
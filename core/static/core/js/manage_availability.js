@@ -8,11 +8,44 @@ const csrftoken = document.querySelector('[name=csrfmiddlewaretoken]').value;
 // -------------------------------
 // Fetch current slots from backend
 // -------------------------------
-async function fetchSlots() {
-  const res = await fetch("/core/api/availability/");
+// Only the displayed window is requested: this week first, then one more
+// week (or the next page of a busy week) per "Show more" click.
+const WINDOW_DAYS = 7;
+let loadedSlots = [];
+let windowEnd = null;     // last date loaded so far
+let windowCursor = null;  // next page inside the current window, if any
+
+function isoDate(day) {
+  const pad = n => String(n).padStart(2, "0");
+  return `${day.getFullYear()}-${pad(day.getMonth() + 1)}-${pad(day.getDate())}`;
+}
+
+function addDays(day, days) {
+  const next = new Date(day);
+  next.setDate(next.getDate() + days);
+  return next;
+}
+
+async function fetchSlots(from, to, cursor = null) {
+  const params = new URLSearchParams({ from: isoDate(from), to: isoDate(to), limit: "200" });
+  if (cursor) params.set("cursor", cursor);
+  const res = await fetch(`/core/api/availability/?${params}`);
   if (!res.ok) throw new Error("Network error");
-  const data = await res.json();
-  return data.slots;
+  return res.json();
+}
+
+async function loadMoreSlots() {
+  let data;
+  if (windowCursor) {
+    data = await fetchSlots(addDays(windowEnd, 1 - WINDOW_DAYS), windowEnd, windowCursor);
+  } else {
+    const from = addDays(windowEnd, 1);
+    windowEnd = addDays(windowEnd, WINDOW_DAYS);
+    data = await fetchSlots(from, windowEnd);
+  }
+  windowCursor = data.next_cursor;
+  loadedSlots.push(...data.slots);
+  renderSlots(loadedSlots);
 }
 
 // -------------------------------
@@ -38,6 +71,7 @@ function renderSlots(slots) {
       📅 <strong>${slot.date}</strong><br>
       ⏰ ${slot.start_time} - ${slot.end_time}<br>
       🧍 Slots: ${slot.booked_slots}/${slot.total_slots}
+      ${slot.on_vacation ? "<br>🏖️ On vacation (hidden from patients)" : ""}
     `;
 
     const rightDiv = document.createElement("div");
@@ -127,6 +161,11 @@ async function addSlot() {
 
         <label>Total Slots</label>
         <input type="number" id="swal-total-slots" class="swal2-input" min="1" value="1">
+
+        <label>Repeat Weekly (weeks)</label>
+        <input type="number" id="swal-repeat-weeks" class="swal2-input" min="1" max="12" value="1">
+
+        <label><input type="checkbox" id="swal-ongoing"> Every week, with no end date</label>
       </div>
     `,
     showCancelButton: true,
@@ -135,20 +174,37 @@ async function addSlot() {
       date: document.getElementById("swal-date").value,
       start_time: document.getElementById("swal-start-time").value,
       end_time: document.getElementById("swal-end-time").value,
-      total_slots: document.getElementById("swal-total-slots").value
+      total_slots: document.getElementById("swal-total-slots").value,
+      repeat_weeks: parseInt(document.getElementById("swal-repeat-weeks").value, 10) || 1,
+      ongoing: document.getElementById("swal-ongoing").checked
     })
   });
 
   if (!formValues) return;
+  if (formValues.ongoing) return addRule(formValues);
+
+  // One slot per repeated week, sent in a single bulk request
+  const slots = [];
+  for (let week = 0; week < formValues.repeat_weeks; week++) {
+    const day = new Date(`${formValues.date}T00:00:00`);
+    day.setDate(day.getDate() + week * 7);
+    const isoDate = `${day.getFullYear()}-${String(day.getMonth() + 1).padStart(2, "0")}-${String(day.getDate()).padStart(2, "0")}`;
+    slots.push({
+      date: isoDate,
+      start_time: formValues.start_time,
+      end_time: formValues.end_time,
+      total_slots: formValues.total_slots
+    });
+  }
 
   try {
-    const res = await fetch("/core/api/availability/add/", {
+    const res = await fetch("/core/api/availability/bulk-add/", {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
         "X-CSRFToken": csrftoken
       },
-      body: JSON.stringify(formValues)
+      body: JSON.stringify({ slots })
     });
 
     const data = await res.json();
@@ -156,14 +212,92 @@ async function addSlot() {
     if (data.success) {
       Swal.fire("Success", "Availability added.", "success");
       refreshSlots();
+    } else if (data.created) {
+      Swal.fire("Partly Added", `${data.created} slot(s) added, ${data.errors.length} skipped (overlapping or invalid).`, "warning");
+      refreshSlots();
     } else {
-      Swal.fire("Error", data.message || "Could not add slot.", "error");
+      const message = data.errors?.[0]?.message || data.message || "Could not add slot.";
+      Swal.fire("Error", message, "error");
     }
   } catch (err) {
     Swal.fire("Error", "Network error.", "error");
   }
 }
 
+// -------------------------------
+// Recurring weekly rules
+// -------------------------------
+// The server turns each rule into concrete slots for the next few weeks
+async function addRule(formValues) {
+  if (!formValues.date) {
+    Swal.fire("Error", "Pick a date to set the weekday.", "error");
+    return;
+  }
+  const weekday = new Date(`${formValues.date}T00:00:00`).toLocaleDateString("en-US", { weekday: "long" });
+  try {
+    const res = await fetch("/core/api/availability/rules/add/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "X-CSRFToken": csrftoken },
+      body: JSON.stringify({
+        weekday,
+        start_time: formValues.start_time,
+        end_time: formValues.end_time,
+        total_slots: formValues.total_slots
+      })
+    });
+    const data = await res.json();
+    if (data.success) {
+      Swal.fire("Success", `You're now available every ${weekday}.`, "success");
+      refreshSlots();
+      refreshRules();
+    } else {
+      Swal.fire("Error", data.message || "Could not add the weekly rule.", "error");
+    }
+  } catch (err) {
+    Swal.fire("Error", "Network error.", "error");
+  }
+}
+
+async function deleteRule(ruleId) {
+  const confirmResult = await Swal.fire({
+    title: "Stop Repeating?",
+    icon: "warning",
+    text: "Upcoming unbooked slots from this rule will be removed. Booked ones stay.",
+    showCancelButton: true,
+    confirmButtonText: "Remove"
+  });
+  if (!confirmResult.isConfirmed) return;
+
+  const res = await fetch(`/core/api/availability/rules/${ruleId}/delete/`, {
+    method: "POST",
+    headers: { "X-CSRFToken": csrftoken }
+  });
+  const data = await res.json();
+  if (!data.success) Swal.fire("Error", data.message || "Could not remove the rule.", "error");
+  refreshSlots();
+  refreshRules();
+}
+
+async function refreshRules() {
+  const ruleList = document.getElementById("weeklyRules");
+  if (!ruleList) return;
+  const res = await fetch("/core/api/availability/rules/");
+  if (!res.ok) return;
+  const { rules } = await res.json();
+
+  ruleList.innerHTML = rules.length ? "" : "<li>No weekly rules</li>";
+  rules.forEach(rule => {
+    const li = document.createElement("li");
+    li.innerHTML = `${rule.weekday} ${rule.start_time} - ${rule.end_time} `;
+    const removeBtn = document.createElement("button");
+    removeBtn.className = "remove-btn";
+    removeBtn.textContent = "Remove";
+    removeBtn.addEventListener("click", () => deleteRule(rule.id));
+    li.appendChild(removeBtn);
+    ruleList.appendChild(li);
+  });
+}
+
 // -------------------------------
 // Weekly Summary (updated)
 // -------------------------------
@@ -188,9 +322,14 @@ function updateWeeklySummary(slots) {
 // Refresh all data
 // -------------------------------
 async function refreshSlots() {
-  const slots = await fetchSlots();
-  renderSlots(slots);
-  updateWeeklySummary(slots);
+  const today = new Date();
+  windowEnd = addDays(today, WINDOW_DAYS - 1);
+  const data = await fetchSlots(today, windowEnd);
+  windowCursor = data.next_cursor;
+  loadedSlots = data.slots;
+  renderSlots(loadedSlots);
+  // The summary covers this week, the same range Clear Week works on
+  updateWeeklySummary(loadedSlots);
 }
 
 // -------------------------------
@@ -200,6 +339,7 @@ function setupQuickSettings() {
   const copyBtn = document.getElementById("copyLastWeekBtn");
   const clearBtn = document.getElementById("clearScheduleBtn");
   const vacationBtn = document.getElementById("vacationModeBtn");
+  const endVacationBtn = document.getElementById("endVacationBtn");
 
   // Copy Last Week
   copyBtn?.addEventListener("click", async () => {
@@ -219,7 +359,10 @@ function setupQuickSettings() {
     });
 
     const data = await res.json();
-    if (data.success) Swal.fire("Copied!", "Slots copied.", "success");
+    if (data.success) {
+      const skipped = data.skipped ? ` ${data.skipped} skipped because they overlap existing slots.` : "";
+      Swal.fire("Copied!", `${data.created} slot${data.created !== 1 ? "s" : ""} copied.${skipped}`, "success");
+    }
     refreshSlots();
   });
 
@@ -241,7 +384,7 @@ function setupQuickSettings() {
     });
 
     const data = await res.json();
-    if (data.success) Swal.fire("Cleared!", "All slots deleted.", "success");
+    if (data.success) Swal.fire("Cleared!", "Unbooked slots deleted. Booked slots were kept.", "success");
     refreshSlots();
   });
 
@@ -277,7 +420,41 @@ function setupQuickSettings() {
     });
 
     const data = await res.json();
-    if (data.success) Swal.fire("Vacation Set", "Schedule blocked.", "success");
+    if (data.success) {
+      Swal.fire("Vacation Set", "Your slots in this range are hidden from patients.", "success");
+    } else {
+      Swal.fire("Error", data.message || "Could not set vacation.", "error");
+    }
+    refreshSlots();
+  });
+
+  // End Vacation (slots were only hidden, so they come straight back)
+  endVacationBtn?.addEventListener("click", async () => {
+    const listRes = await fetch("/core/api/availability/vacations/");
+    const { vacations = [] } = await listRes.json();
+    if (!vacations.length) {
+      Swal.fire("No Vacation", "You have no current or upcoming vacation.", "info");
+      return;
+    }
+
+    const options = {};
+    vacations.forEach(v => { options[v.id] = `${v.start} to ${v.end}`; });
+    const { value: vacationId } = await Swal.fire({
+      title: "End Vacation",
+      input: "select",
+      inputOptions: options,
+      showCancelButton: true,
+      confirmButtonText: "End"
+    });
+    if (!vacationId) return;
+
+    const res = await fetch(`/core/api/availability/vacations/${vacationId}/end/`, {
+      method: "POST",
+      headers: { "X-CSRFToken": csrftoken }
+    });
+
+    const data = await res.json();
+    if (data.success) Swal.fire("Welcome Back", "Your slots are open again.", "success");
     refreshSlots();
   });
 }
@@ -287,6 +464,8 @@ function setupQuickSettings() {
 // -------------------------------
 document.addEventListener("DOMContentLoaded", () => {
   document.getElementById("addSlotBtn")?.addEventListener("click", addSlot);
+  document.getElementById("loadMoreSlotsBtn")?.addEventListener("click", loadMoreSlots);
   setupQuickSettings();
   refreshSlots();
+  refreshRules();
 });
@@ -0,0 +1,43 @@
+# core/testing.py
+#
+# Test helpers for query budgets. Mix QueryBudgetMixin into a TestCase and
+# call assertQueryBudget(url) to fail when a view runs more queries than it
+# declared with @query_budget (or the QUERY_BUDGET default), or when any
+# query shape repeats often enough to look like an N+1.
+
+from contextlib import contextmanager
+
+from django.urls import resolve
+
+from .middleware import DEFAULT_QUERY_BUDGET, REPEAT_THRESHOLD, QueryCounter
+
+
+def describe(counter, threshold=REPEAT_THRESHOLD):
+    lines = [f'{counter.count} queries']
+    lines += [f'  {n}x {shape}' for shape, n in counter.repeated(threshold)]
+    return '\n'.join(lines)
+
+
+class QueryBudgetMixin:
+
+    @contextmanager
+    def assertMaxQueries(self, budget, repeat_threshold=REPEAT_THRESHOLD):
+        """Like assertNumQueries, but an upper bound that also rejects repeated shapes."""
+        with QueryCounter() as counter:
+            yield counter
+        if counter.count > budget:
+            self.fail(f'Query budget exceeded ({budget} allowed): {describe(counter, repeat_threshold)}')
+        if counter.repeated(repeat_threshold):
+            self.fail(f'Repeated queries (likely N+1): {describe(counter, repeat_threshold)}')
+
+    def assertQueryBudget(self, path, budget=None, method='get', repeat_threshold=REPEAT_THRESHOLD, **kwargs):
+        """
+        Request `path` with self.client and check it against `budget`, which
+        defaults to the budget the view declares. Returns the response.
+        """
+        if budget is None:
+            view = resolve(path.split('?', 1)[0]).func
+            budget = getattr(view, 'query_budget', DEFAULT_QUERY_BUDGET)
+        with self.assertMaxQueries(budget, repeat_threshold):
+            response = getattr(self.client, method)(path, **kwargs)
+        return response
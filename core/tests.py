@@ -1,3 +1,391 @@
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .availability_index import availability_index
+from .models import (
+    Appointment, ArchivedAppointment, Availability, AvailabilityRule, CounselorStats, VacationPeriod,
+)
+from .testing import QueryBudgetMixin
+from .services import (
+    BookingError, SlotFullError, book_slot, cancel_appointment, complete_appointment, find_overlapping,
+    held_seats, join_waitlist, materialize_rules, place_hold,
+)
+
+User = get_user_model()
+
+
+class CoreTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.counselor = User.objects.create_user(
+            email='counselor@example.com', full_name='Casey Counselor', role='counselor',
+            is_verified=True, specializations=['Anxiety & Stress'], years_experience=5,
+        )
+        cls.patient = User.objects.create_user(email='patient@example.com', full_name='Pat Patient')
+        cls.day = timezone.localdate() + timedelta(days=2)
+
+
+class FindOverlappingTests(CoreTestCase):
+    def setUp(self):
+        Availability.objects.create(counselor=self.counselor, date=self.day, start_time=time(10), end_time=time(12))
+
+    def check(self, *intervals):
+        return find_overlapping(self.counselor.id, [(self.day, time(a), time(b)) for a, b in intervals])
+
+    def test_new_starts_before_existing(self):
+        self.assertEqual(self.check((9, 11)), {0})
+
+    def test_new_starts_inside_existing(self):
+        self.assertEqual(self.check((11, 13)), {0})
+
+    def test_new_contains_existing(self):
+        self.assertEqual(self.check((8, 13)), {0})
+
+    def test_touching_intervals_are_fine(self):
+        self.assertEqual(self.check((8, 10), (12, 13)), set())
+
+    def test_new_slots_overlapping_each_other(self):
+        self.assertEqual(self.check((13, 15), (14, 16), (16, 17)), {1})
+
+    def test_rejected_slot_does_not_block_later_ones(self):
+        self.assertEqual(self.check((9, 13), (12, 13)), {0})
+
+
+class HoldAndWaitlistTests(CoreTestCase):
+    def setUp(self):
+        cache.clear()
+        self.other = User.objects.create_user(email='other@example.com', full_name='Other Patient')
+        self.slot = Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=1,
+        )
+
+    def test_held_seat_can_be_waitlisted(self):
+        place_hold(self.other, self.slot.id)
+        with self.assertRaises(SlotFullError):
+            book_slot(self.patient, self.counselor, self.slot.id)
+        _, position = join_waitlist(self.patient, self.slot.id)
+        self.assertEqual(position, 1)
+
+    def test_waitlist_skips_vacation(self):
+        waiter = User.objects.create_user(email='waiter@example.com', full_name='Wait Er')
+        appointment = book_slot(self.patient, self.counselor, self.slot.id)
+        join_waitlist(waiter, self.slot.id)
+        VacationPeriod.objects.create(counselor=self.counselor, start_date=self.day, end_date=self.day)
+
+        with self.assertRaises(BookingError):
+            join_waitlist(self.other, self.slot.id)
+        cancel_appointment(appointment)
+
+        self.assertFalse(Appointment.objects.filter(patient=waiter).exists())
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked_slots, 0)
+
+    def test_own_hold_is_consumed_by_booking(self):
+        place_hold(self.patient, self.slot.id)
+        book_slot(self.patient, self.counselor, self.slot.id)
+        self.assertEqual(held_seats([self.slot.id]), {})
+
+    def test_no_hold_for_a_patient_already_booked_that_day(self):
+        other_slot = Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(11), end_time=time(12), total_slots=1,
+        )
+        book_slot(self.patient, self.counselor, other_slot.id)
+        with self.assertRaises(BookingError):
+            place_hold(self.patient, self.slot.id)
+        self.assertEqual(held_seats([self.slot.id]), {})
+
+    def test_booking_does_not_take_the_hold_lock(self):
+        with patch('core.services._slot_hold_lock') as lock:
+            book_slot(self.patient, self.counselor, self.slot.id)
+        lock.assert_not_called()
+
+
+class IdempotencyTests(CoreTestCase):
+    def setUp(self):
+        cache.clear()
+        self.slot = Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=2,
+        )
+        self.client.force_login(self.patient)
+
+    def book(self):
+        return self.client.post(
+            reverse('book_counselor', args=[self.counselor.id]),
+            {'slot_id': self.slot.id},
+            headers={'Idempotency-Key': 'retry-me'},
+        )
+
+    def test_replay_is_one_cache_read_and_no_writes(self):
+        first = self.book()
+        self.assertEqual(first.status_code, 200)
+
+        with patch('core.decorators.cache', wraps=cache) as wrapped, \
+                CaptureQueriesContext(connection) as queries:
+            replay = self.book()
+
+        self.assertEqual(wrapped.get.call_count, 1)
+        wrapped.set.assert_not_called()
+        wrapped.add.assert_not_called()
+        writes = [q['sql'] for q in queries if q['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(writes, [])
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.content, first.content)
+        self.assertEqual(Appointment.objects.filter(patient=self.patient).count(), 1)
+
+
+class SoonestSortTests(CoreTestCase):
+    def test_sort_keeps_everyone_without_writing(self):
+        idle = User.objects.create_user(
+            email='idle@example.com', full_name='Idle Counselor', role='counselor', is_verified=True,
+        )
+        User.objects.filter(id=self.counselor.id).update(next_open_slot_at=timezone.now() + timedelta(days=1))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('counselors_page'), {'sort': 'soonest'})
+            ids = [c.id for c in response.context['counselors']]
+
+        self.assertEqual(ids, [self.counselor.id, idle.id])
+        self.assertFalse([q for q in queries if q['sql'].lstrip().upper().startswith('UPDATE')])
+
+    def test_refresh_repairs_stale_values(self):
+        Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=1,
+        )
+        # Stored value points at a slot that has already started
+        User.objects.filter(id=self.counselor.id).update(next_open_slot_at=timezone.now() - timedelta(hours=1))
+
+        call_command('refresh_next_open_slots', '--stale-only', stdout=StringIO())
+
+        self.counselor.refresh_from_db()
+        self.assertEqual(timezone.localtime(self.counselor.next_open_slot_at).date(), self.day)
+
+
+class PatientRecordsTests(CoreTestCase):
+    def test_rollup_includes_archived_sessions(self):
+        old = timezone.localdate() - timedelta(days=500)
+        ArchivedAppointment.objects.create(
+            id=10_000, patient=self.patient, counselor=self.counselor, date=old, time=time(9),
+            status='completed', created_at=timezone.now(), updated_at=timezone.now(),
+        )
+        returning = User.objects.create_user(email='returning@example.com', full_name='Returning Patient')
+        ArchivedAppointment.objects.create(
+            id=10_001, patient=returning, counselor=self.counselor, date=old, time=time(9),
+            status='completed', created_at=timezone.now(), updated_at=timezone.now(),
+        )
+        Appointment.objects.create(patient=returning, counselor=self.counselor, date=self.day, time=time(9))
+        self.client.force_login(self.counselor)
+
+        response = self.client.get(reverse('patient_records'))
+
+        rows = {p.id: p for p in response.context['patients']}
+        self.assertEqual(rows[self.patient.id].sessions_count, 1)
+        self.assertEqual(rows[self.patient.id].last_session, old)
+        self.assertEqual(rows[self.patient.id].latest_status, 'completed')
+        self.assertEqual(rows[returning.id].sessions_count, 2)
+        self.assertEqual(rows[returning.id].last_session, self.day)
+        self.assertEqual(rows[returning.id].latest_status, 'Pending')
+
+
+class CancelAppointmentTests(CoreTestCase):
+    def stats(self):
+        return CounselorStats.objects.filter(counselor=self.counselor).values(
+            'sessions', 'completed', 'cancelled', 'patients', 'delivered_minutes',
+        ).get()
+
+    def test_finished_appointments_cannot_be_cancelled(self):
+        slot = Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=1,
+        )
+        appointment = book_slot(self.patient, self.counselor, slot.id)
+        complete_appointment(appointment, 'Went well')
+
+        self.assertFalse(cancel_appointment(appointment))
+
+        self.assertStatsMatchRebuild()
+        self.assertEqual(Appointment.objects.get(id=appointment.id).status, 'completed')
+
+    def test_pending_appointment_is_cancelled(self):
+        slot = Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=1,
+        )
+        appointment = book_slot(self.patient, self.counselor, slot.id)
+
+        self.assertTrue(cancel_appointment(appointment))
+        slot.refresh_from_db()
+        self.assertEqual(slot.booked_slots, 0)
+
+    def assertStatsMatchRebuild(self):
+        incremental = self.stats()
+        call_command('rebuild_counselor_stats', stdout=StringIO())
+        self.assertEqual(incremental, self.stats())
+
+    def test_cancelled_appointment_cannot_be_completed(self):
+        slot = Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=1,
+        )
+        appointment = book_slot(self.patient, self.counselor, slot.id)
+        cancel_appointment(appointment)
+        self.client.force_login(self.counselor)
+
+        response = self.client.post(
+            reverse('end_session', args=[appointment.id]), '{"notes": "x"}', content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Appointment.objects.get(id=appointment.id).status, 'cancelled')
+        self.assertStatsMatchRebuild()
+
+    def test_cancel_with_waitlist_promotion_keeps_stats_in_sync(self):
+        slot = Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=1,
+        )
+        waiter = User.objects.create_user(email='waiter@example.com', full_name='Wait Er')
+        appointment = book_slot(self.patient, self.counselor, slot.id)
+        join_waitlist(waiter, slot.id)
+
+        with patch('core.services.notify_waitlist_promotion'), self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(cancel_appointment(appointment))
+
+        self.assertTrue(Appointment.objects.filter(patient=waiter, slot=slot).exists())
+        self.assertStatsMatchRebuild()
+
+
+class SearchAvailabilityTests(CoreTestCase):
+    def test_specialization_name_is_slugified(self):
+        Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=1,
+        )
+        availability_index.invalidate()
+        self.client.force_login(self.patient)
+
+        response = self.client.get(reverse('search_availability'), {'specialization': 'Anxiety & Stress'})
+
+        self.assertEqual([r['counselor_id'] for r in response.json()['results']], [self.counselor.id])
+
+    def test_delisted_counselor_drops_out_before_the_next_rebuild(self):
+        Availability.objects.create(
+            counselor=self.counselor, date=self.day, start_time=time(9), end_time=time(10), total_slots=1,
+        )
+        availability_index.invalidate()
+        self.assertTrue(availability_index.search(time(8), time(12)))
+
+        User.objects.filter(id=self.counselor.id).update(is_active=False)
+        availability_index.mark_dirty(self.counselor.id)
+
+        self.assertEqual(availability_index.search(time(8), time(12)), [])
+
+
+class QueryBudgetTests(QueryBudgetMixin, CoreTestCase):
+    """Each view must stay within its @query_budget with enough rows to expose an N+1."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(8):
+            patient = User.objects.create_user(email=f'budget{i}@example.com', full_name=f'Budget Patient {i}')
+            for days_ago in (3, 20):
+                day = timezone.localdate() - timedelta(days=days_ago + i)
+                Appointment.objects.create(
+                    patient=patient, counselor=cls.counselor, date=day, time=time(9), status='completed',
+                )
+                Appointment.objects.create(
+                    patient=cls.patient, counselor=cls.counselor, date=day, time=time(10 + i % 6), status='completed',
+                )
+            ArchivedAppointment.objects.create(
+                id=20_000 + i, patient=patient, counselor=cls.counselor,
+                date=timezone.localdate() - timedelta(days=400 + i), time=time(9), status='completed',
+                created_at=timezone.now(), updated_at=timezone.now(),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_user_dashboard(self):
+        self.client.force_login(self.patient)
+        self.assertQueryBudget(reverse('user_dashboard'))
+
+    def test_counselor_dashboard(self):
+        self.client.force_login(self.counselor)
+        self.assertQueryBudget(reverse('counselor_dashboard'))
+
+    def test_patient_records(self):
+        self.client.force_login(self.counselor)
+        self.assertQueryBudget(reverse('patient_records'))
+        self.assertQueryBudget(reverse('patient_records') + '?q=Budget')
+
+    def test_past_sessions(self):
+        self.client.force_login(self.patient)
+        self.assertQueryBudget(reverse('past_sessions'))
+
+    def test_session_history(self):
+        self.client.force_login(self.patient)
+        self.assertQueryBudget(reverse('session_history'))
+        self.client.force_login(self.counselor)
+        self.assertQueryBudget(reverse('session_history') + '?q=Budget')
+
+
+class SlotCreationOverlapTests(CoreTestCase):
+    def setUp(self):
+        self.client.force_login(self.counselor)
+
+    def test_materialized_rule_skips_overlapping_dates(self):
+        weekday = self.day.strftime('%A')
+        Availability.objects.create(counselor=self.counselor, date=self.day, start_time=time(14), end_time=time(16))
+        AvailabilityRule.objects.create(
+            counselor=self.counselor, weekday=weekday, start_time=time(15), end_time=time(17),
+        )
+
+        materialize_rules([self.counselor.id], until=self.day + timedelta(days=7))
+
+        self.assertEqual(
+            list(Availability.objects.filter(date=self.day).values_list('start_time', flat=True)), [time(14)]
+        )
+        self.assertTrue(Availability.objects.filter(date=self.day + timedelta(days=7), start_time=time(15)).exists())
+
+    def test_copy_last_week_skips_overlaps(self):
+        last_week = date.today() - timedelta(days=7)  # copy_last_week works from date.today()
+        Availability.objects.create(counselor=self.counselor, date=last_week, start_time=time(14), end_time=time(16))
+        Availability.objects.create(
+            counselor=self.counselor, date=last_week + timedelta(days=7), start_time=time(15), end_time=time(17),
+        )
+
+        data = self.client.post('/core/api/availability/copy-last-week/').json()
+
+        self.assertEqual((data['created'], data['skipped']), (0, 1))
+
+    def test_rule_must_end_after_it_starts(self):
+        data = self.client.post(
+            '/core/api/availability/rules/add/',
+            '{"weekday": "Monday", "start_time": "05:00 PM", "end_time": "03:00 PM"}',
+            content_type='application/json',
+        ).json()
+
+        self.assertFalse(data['success'])
+        self.assertFalse(AvailabilityRule.objects.exists())
+
+    def test_deleting_a_rule_keeps_hand_made_slots(self):
+        weekday = self.day.strftime('%A')
+        rule = AvailabilityRule.objects.create(
+            counselor=self.counselor, weekday=weekday, start_time=time(15), end_time=time(17),
+        )
+        materialize_rules([self.counselor.id], until=self.day)
+        generated = Availability.objects.get(rule=rule, date=self.day)
+        # Hand-made slot with the same times one week later
+        hand_made = Availability.objects.create(
+            counselor=self.counselor, date=self.day + timedelta(days=7), start_time=time(15), end_time=time(17),
+        )
+
+        self.client.post(f'/core/api/availability/rules/{rule.id}/delete/')
 
-# Create your tests here.
+        self.assertFalse(Availability.objects.filter(id=generated.id).exists())
+        self.assertTrue(Availability.objects.filter(id=hand_made.id).exists())
@@ -32,13 +32,30 @@ urlpatterns = [
 
     path('api/availability/', views.get_availability),
     path('api/availability/add/', views.add_availability),
+    path('api/availability/bulk-add/', views.bulk_add_availability),
     path('api/availability/<int:slot_id>/delete/', views.delete_availability),
     path('api/availability/copy-last-week/', views.copy_last_week),
     path('api/availability/clear-week/', views.clear_week),
     path('api/availability/vacation-mode/', views.vacation_mode),
+    path('api/availability/vacations/', views.get_vacations, name='get_vacations'),
+    path('api/availability/vacations/<int:vacation_id>/end/', views.end_vacation, name='end_vacation'),
+    path('api/availability/rules/', views.get_availability_rules),
+    path('api/availability/rules/add/', views.add_availability_rule),
+    path('api/availability/rules/<int:rule_id>/delete/', views.delete_availability_rule),
 
     path('api/availability/counselor/<int:counselor_id>/', views.get_counselor_availability, name='get_counselor_availability'),
+    path('api/availability/counselors/', views.get_directory_availability, name='get_directory_availability'),
+    path('api/availability/search/', views.search_availability, name='search_availability'),
+    path('api/counselors/match/', views.match_counselors, name='match_counselors'),
+    path('api/calendar/<int:year>/<int:month>/', views.get_month_calendar, name='month_calendar'),
+    path('api/calendar/feed-url/', views.calendar_feed_url, name='calendar_feed_url'),
+    path('api/sessions/history/', views.get_session_history, name='session_history'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     path('cancel-booking/<int:appointment_id>/', views.cancel_booking, name='cancel_booking'),
+    path('api/availability/<int:slot_id>/hold/', views.hold_slot, name='hold_slot'),
+    path('api/availability/<int:slot_id>/hold/release/', views.release_slot_hold, name='release_slot_hold'),
+    path('api/availability/<int:slot_id>/waitlist/', views.join_slot_waitlist, name='join_slot_waitlist'),
+    path('api/availability/<int:slot_id>/waitlist/leave/', views.leave_slot_waitlist, name='leave_slot_waitlist'),
 
     # core/urls.py
     path('session/<int:appointment_id>/join/', views.join_session, name='join_session'),
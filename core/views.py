@@ -1,21 +1,45 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 #from accounts.models import User
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from datetime import datetime, timedelta, date
-from django.http import JsonResponse
-from .models import Appointment, Availability
+from django.utils.text import slugify
+from datetime import datetime, timedelta, date, time as dt_time
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from .models import (
+    SPECIALIZATIONS, WEEKDAYS, Appointment, ArchivedAppointment, Availability, AvailabilityRule, CounselorStats,
+    VacationPeriod, WaitlistEntry,
+)
+from .services import (
+    BookingError, SlotFullError, apply_holds, availability_changed, book_slot, cached_dashboard,
+    cancel_appointment, complete_appointment, counselor_open_slots, counselor_profile_changed,
+    find_overlapping, join_waitlist, materialize_rules, month_calendar, open_slots_for_counselors,
+    place_hold, release_hold, serialize_slot, session_history,
+)
+from .availability_index import availability_index
+from .matching import matching_engine
+from .decorators import idempotent
+from .middleware import query_budget
+from .ics import appointment_event, calendar_footer, calendar_header
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
 from admin_panel.models import WellnessTip
 from django.views.decorators.csrf import csrf_exempt
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 import json
+import time
 
 User = get_user_model()
 
 @login_required
+@query_budget(10)
 def user_dashboard(request):
     if request.user.role != 'user':
         return redirect('login')
@@ -23,32 +47,26 @@ def user_dashboard(request):
     first_name = request.user.full_name.split()[0] if request.user.full_name else 'User'
     full_name = request.user.full_name or 'User'
 
-    today = timezone.now().date()
-
-    # Today's appointments
-    todays_appointments = Appointment.objects.filter(
-        patient=request.user,
-        date=today
-    ).order_by('time')
-
-    # Upcoming sessions (future dates)
-    upcoming_sessions = Appointment.objects.filter(
-        patient=request.user,
-        date__gt=today
-    ).order_by('date', 'time')
-
-    # ✅ Wellness Tips (dynamic from admin)
-    wellness_tips = WellnessTip.objects.all()[:5]  # you can change count as needed
+    def build():
+        today = timezone.localdate()
+        appointments = Appointment.objects.filter(patient=request.user).exclude(status='cancelled').select_related('counselor')
+        return {
+            # Today's appointments
+            'todays_appointments': list(appointments.filter(date=today).order_by('time')),
+            # Upcoming sessions (future dates)
+            'upcoming_sessions': list(appointments.filter(date__gt=today).order_by('date', 'time')),
+            # ✅ Wellness Tips (dynamic from admin)
+            'wellness_tips': list(WellnessTip.objects.all()[:5]),  # you can change count as needed
+        }
 
+    # Cached per user; core.signals bumps the version on any relevant write
     return render(
         request,
         'core/user_dashboard.html',
         {
             'first_name': first_name,
             'full_name': full_name,
-            'todays_appointments': todays_appointments,
-            'upcoming_sessions': upcoming_sessions,
-            'wellness_tips': wellness_tips,  # <-- add this
+            **cached_dashboard(request.user, build),
         }
     )
 
@@ -127,15 +145,13 @@ def start_session(request, appointment_id):
 @csrf_exempt
 def end_session(request, appointment_id):
     if request.method == 'POST':
-        appointment = get_object_or_404(Appointment, id=appointment_id)
+        appointment = get_object_or_404(Appointment.objects.select_related('slot'), id=appointment_id)
         if request.user != appointment.counselor:
             return JsonResponse({'success': False, 'message': 'Not authorized.'})
         
         data = json.loads(request.body)
-        notes = data.get('notes', '')
-        appointment.status = 'completed'
-        appointment.counselor_notes = notes
-        appointment.save()
+        if not complete_appointment(appointment, data.get('notes', '')):
+            return JsonResponse({'success': False, 'message': 'This session can no longer be completed.'}, status=400)
         
         return JsonResponse({'success': True})
     
@@ -144,24 +160,14 @@ def end_session(request, appointment_id):
 
 @login_required
 @csrf_exempt
+@idempotent
 def cancel_booking(request, appointment_id):
     appointment = get_object_or_404(Appointment, id=appointment_id, patient=request.user)
     
     if request.method == "POST":
-        # Decrease booked slots for the corresponding availability
-        try:
-            slot = Availability.objects.get(
-                counselor=appointment.counselor,
-                date=appointment.date,
-                start_time=appointment.time
-            )
-            if slot.booked_slots > 0:
-                slot.booked_slots -= 1
-                slot.save()
-        except Availability.DoesNotExist:
-            pass  # If slot doesn't exist, just continue
-        
-        appointment.delete()
+        # Frees the seat through appointment.slot (one indexed lookup + atomic decrement)
+        if not cancel_appointment(appointment):
+            return JsonResponse({'success': False, 'message': 'This appointment can no longer be cancelled'}, status=400)
         return JsonResponse({'success': True})
     
     return JsonResponse({'success': False, 'message': 'Invalid request'})
@@ -175,9 +181,19 @@ def counselor_dashboard1(request):
     return render(request, 'core/counselor_dashboard.html', {'first_name': first_name})
 
 
+def listed_counselors():
+    """Counselors shown in the public directory."""
+    return User.objects.filter(role='counselor', is_verified=True, is_active=True)
+
+
 def counselors_page(request):
-   counselors = User.objects.filter(role='counselor', is_verified=True, is_active=True)
-   return render(request, 'core/counselorsfilter.html', {'counselors': counselors})
+   counselors = listed_counselors()
+   sort = request.GET.get('sort')
+   if sort == 'soonest':
+       # next_open_slot_at is maintained on every slot/booking write (indexed) and
+       # refreshed by refresh_next_open_slots; counselors with no open slot sort last
+       counselors = counselors.order_by(F('next_open_slot_at').asc(nulls_last=True), 'id')
+   return render(request, 'core/counselorsfilter.html', {'counselors': counselors, 'sort': sort})
 
 
 
@@ -186,48 +202,222 @@ def manage_availability(request):
 
 
 @login_required
+@query_budget(10)
 def counselor_dashboard(request):
     if request.user.role != 'counselor':
         return redirect('login')
 
-    today = timezone.now().date()
+    def build():
+        today = timezone.localdate()
+        active_appointments = (
+            Appointment.objects.filter(counselor=request.user).exclude(status='cancelled').select_related('patient')
+        )
+        # Maintained on every booking/cancel/complete (see core.services.record_counselor_stats)
+        stats = CounselorStats.objects.filter(counselor=request.user).first() or CounselorStats(counselor=request.user)
+        return {
+            'today_appointments': list(active_appointments.filter(date=today).order_by('time')),
+            'upcoming_appointments': list(active_appointments.filter(date__gt=today).order_by('date', 'time')[:5]),
+            'total_patients': stats.patients,
+            'sessions_count': stats.completed,
+            'cancelled_count': stats.cancelled,
+            'hours_count': stats.delivered_hours,
+        }
 
-    today_appointments = Appointment.objects.filter(counselor=request.user, date=today)
-    upcoming_appointments = Appointment.objects.filter(counselor=request.user, date__gt=today).order_by('date', 'time')[:5]
+    # Cached per user; core.signals bumps the version on any relevant write
+    return render(request, 'core/counselor_dashboard.html', cached_dashboard(request.user, build))
 
-    total_patients = Appointment.objects.filter(counselor=request.user).count()
-    sessions_count = Appointment.objects.filter(counselor=request.user).count()
-    hours_count = 0  # You can calculate hours if you have a duration field
+@login_required
+def get_counselor_availability(request, counselor_id):
+    get_object_or_404(User, id=counselor_id, role='counselor')
+    # Filtering (date >= today, seats left) runs in SQL and the result is cached per counselor;
+    # seats other patients are holding are subtracted on the way out
+    slots = apply_holds(counselor_open_slots(counselor_id), viewer_id=request.user.id)
+    return JsonResponse({"slots": slots})
 
-    context = {
-        'today_appointments': today_appointments,
-        'upcoming_appointments': upcoming_appointments,
-        'total_patients': total_patients,
-        'sessions_count': sessions_count,
-        'hours_count': hours_count,
-    }
-    return render(request, 'core/counselor_dashboard.html', context)
 
 @login_required
-def get_counselor_availability(request, counselor_id):
-    counselor = get_object_or_404(User, id=counselor_id, role='counselor')
-    slots = Availability.objects.filter(counselor=counselor).order_by('date', 'start_time')
-    
-    data = [
-        {
-            "id": s.id,
-            "weekday": s.weekday,
-            "date": s.date.strftime("%Y-%m-%d"),
-            "start_time": s.start_time.strftime("%I:%M %p"),
-            "end_time": s.end_time.strftime("%I:%M %p"),
-            "total_slots": s.total_slots,
-            "booked_slots": s.booked_slots,
-            "available_slots": s.total_slots - s.booked_slots
-        }
-        for s in slots if s.total_slots - s.booked_slots > 0
-    ]
-    
-    return JsonResponse({"slots": data})
+def get_directory_availability(request):
+    """
+    Open slots for many counselors in one round trip.
+
+    Pass ?ids=1,2,3 for specific counselor cards, or the directory filter
+    (?q=<name>&specialization=<slug>) to get every matching counselor.
+    """
+    ids = request.GET.get("ids")
+    if ids:
+        try:
+            counselor_ids = [int(cid) for cid in ids.split(",") if cid.strip()]
+        except ValueError:
+            return JsonResponse({"error": "Invalid counselor ids"}, status=400)
+        counselor_ids = list(
+            listed_counselors().filter(id__in=counselor_ids[:500]).values_list("id", flat=True)
+        )
+    else:
+        counselors = listed_counselors()
+        name = request.GET.get("q", "").strip()
+        if name:
+            counselors = counselors.filter(full_name__icontains=name)
+        specialization = request.GET.get("specialization", "all")
+        if specialization != "all":
+            # Same slug matching as the directory cards (specializations is a JSONField list)
+            counselor_ids = [
+                c.id for c in counselors.only("id", "specializations")
+                if specialization in [slugify(s) for s in c.get_specializations_list()]
+            ]
+        else:
+            counselor_ids = list(counselors.values_list("id", flat=True))
+
+    slots = open_slots_for_counselors(counselor_ids)
+    all_slots = [slot for data in slots.values() for slot in data]
+    held = apply_holds(all_slots, viewer_id=request.user.id)
+    if held is not all_slots:
+        remaining = {slot["id"]: slot for slot in held}
+        slots = {cid: [remaining[s["id"]] for s in data if s["id"] in remaining] for cid, data in slots.items()}
+    return JsonResponse({"counselors": {str(cid): data for cid, data in slots.items()}})
+
+
+@login_required
+def search_availability(request):
+    """
+    Soonest open slots across all counselors inside a time window, e.g.
+    ?weekday=Tuesday&start=15:00&end=17:00&specialization=anxiety-stress&k=10
+    """
+    try:
+        start = datetime.strptime(request.GET.get("start", "00:00"), "%H:%M").time()
+        end_param = request.GET.get("end")
+        end = datetime.strptime(end_param, "%H:%M").time() if end_param else None
+        date_from = request.GET.get("from")
+        date_from = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else None
+        date_to = request.GET.get("to")
+        date_to = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else None
+        k = min(int(request.GET.get("k", 10)), 50)
+    except ValueError:
+        return JsonResponse({"error": "Invalid search parameters"}, status=400)
+
+    weekday = request.GET.get("weekday") or None
+    if weekday is not None and weekday not in dict(WEEKDAYS):
+        return JsonResponse({"error": "Invalid weekday"}, status=400)
+
+    matches = availability_index.search(
+        start,
+        end or datetime.max.time(),
+        date_from=date_from,
+        date_to=date_to,
+        weekday=weekday,
+        specialization=slugify(request.GET.get("specialization", "")),
+        k=k,
+    )
+    return JsonResponse({
+        "results": [
+            {"counselor_id": counselor["id"], "counselor_name": counselor["name"], "slot": serialize_slot(slot)}
+            for counselor, slot in matches
+        ]
+    })
+
+
+@login_required
+def match_counselors(request):
+    """
+    Counselors ranked for a patient, e.g. ?specializations=anxiety-stress,grief-loss&k=5.
+    Scores weigh specialization overlap, soonest open slot, current load and experience.
+    """
+    try:
+        k = max(1, min(int(request.GET.get("k", 10)), 50))
+    except ValueError:
+        return JsonResponse({"error": "Invalid k"}, status=400)
+    wanted = {slugify(s) for s in request.GET.get("specializations", "").split(",") if s.strip()}
+
+    return JsonResponse({
+        "results": [
+            {
+                "counselor_id": counselor["id"],
+                "counselor_name": counselor["name"],
+                "years_experience": counselor["years_experience"],
+                "score": round(score, 4),
+                "breakdown": {name: round(value, 4) for name, value in breakdown.items()},
+            }
+            for counselor, score, breakdown in matching_engine.top_k(wanted, k=k)
+        ]
+    })
+
+
+@login_required
+def get_month_calendar(request, year, month):
+    if not 1 <= month <= 12 or not 1 <= year <= 9999:
+        return JsonResponse({"error": "Invalid month"}, status=400)
+    return JsonResponse(month_calendar(request.user, year, month))
+
+
+# -----------------------------
+# ICALENDAR FEED
+# -----------------------------
+
+CALENDAR_FEED_SALT = "core.calendar-feed"
+
+
+@login_required
+def calendar_feed_url(request):
+    """Private subscription URL for the user's calendar app (signed, no login needed)."""
+    token = signing.dumps(request.user.id, salt=CALENDAR_FEED_SALT)
+    return JsonResponse({"url": request.build_absolute_uri(reverse("calendar_feed", args=[token]))})
+
+
+def calendar_feed(request, token):
+    """
+    Streaming .ics of the user's appointments.
+
+    The ETag is built from one COUNT/MAX(updated_at) aggregate, so an
+    unchanged feed answers 304 without rendering anything. Clients that
+    send back the X-Sync-Token as ?since= get only the events changed
+    since then, unless rows have disappeared in between (then the full
+    feed is sent so the client can drop them).
+    """
+    try:
+        user_id = signing.loads(token, salt=CALENDAR_FEED_SALT)
+    except signing.BadSignature:
+        raise Http404
+    user = get_object_or_404(User, id=user_id, is_active=True)
+    owner = {"counselor": user} if user.role == "counselor" else {"patient": user}
+    appointments = Appointment.objects.filter(**owner)
+
+    since = None
+    if request.GET.get("since"):
+        try:
+            since = decode_cursor(request.GET["since"], datetime, int)
+        except ValueError:
+            since = None  # unknown token: fall back to the full feed
+
+    stats = appointments.aggregate(
+        count=Count("id"),
+        last_modified=Max("updated_at"),
+        **({"created_since": Count("id", filter=Q(created_at__gt=since[0]))} if since else {}),
+    )
+    last_modified = stats["last_modified"]
+    sync_token = encode_cursor(last_modified, stats["count"]) if last_modified else ""
+
+    delta = since is not None and stats["count"] == since[1] + stats["created_since"]
+    etag = f'"{stats["count"]}-{int(last_modified.timestamp() * 1000000) if last_modified else 0}"'
+    unchanged = delta and (last_modified is None or last_modified <= since[0])
+    if unchanged or request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    if delta:
+        appointments = appointments.filter(updated_at__gt=since[0])
+    rows = appointments.select_related("patient", "counselor", "slot").order_by("id").iterator(chunk_size=500)
+
+    def stream():
+        yield from calendar_header(f"MindEase - {user.full_name}")
+        for appointment in rows:
+            yield appointment_event(appointment, user)
+        yield from calendar_footer()
+
+    response = StreamingHttpResponse(stream(), content_type="text/calendar; charset=utf-8")
+    response["ETag"] = etag
+    response["X-Sync-Token"] = sync_token
+    response["X-Sync-Delta"] = "true" if delta else "false"
+    return response
 
 
 @login_required
@@ -247,6 +437,7 @@ def manage_availability(request):
                 start_time=start_time,
                 end_time=end_time
             )
+            availability_changed(request.user.id)
             return redirect('manage_availability')
 
     availabilities = Availability.objects.filter(counselor=request.user, date__gte=timezone.now().date())
@@ -268,35 +459,114 @@ def get_support(request):
 
 
 @login_required
+@query_budget(12)
 def patient_records(request):
     if request.user.role != "counselor":
         return redirect("login")
 
-    completed_sessions = Appointment.objects.filter(counselor=request.user).order_by('-date', '-time')
+    query = request.GET.get("q", "").strip()
+    name_filter = {"patient__full_name__icontains": query} if query else {}
+
+    # One GROUP BY patient over this counselor's live appointments, unioned
+    # with the same aggregate over the archive, then merged per patient.
+    # Names and latest status are only loaded for the patients on the page.
+    def per_patient(model):
+        return (
+            model.objects.filter(counselor=request.user, **name_filter)
+            .values("patient_id")
+            .annotate(sessions_count=Count("id"), last_session=Max("date"))
+            .order_by()
+        )
 
-    patients = []
-    seen = set()
-    for session in completed_sessions:
-        if session.patient.id in seen:
-            continue
-        seen.add(session.patient.id)
-        patients.append({
-            "id": session.patient.id,
-            "full_name": session.patient.full_name,
-            "status": session.status,
-            "last_session": session.date.strftime("%b %d, %Y"),
-            "sessions_count": Appointment.objects.filter(counselor=request.user, patient=session.patient).count(),
-            "primary_concern": getattr(session.patient, "primary_concern", "Counseling")
-        })
+    totals = {}
+    for row in per_patient(Appointment).union(per_patient(ArchivedAppointment), all=True):
+        entry = totals.setdefault(row["patient_id"], {"sessions_count": 0, "last_session": row["last_session"]})
+        entry["sessions_count"] += row["sessions_count"]
+        entry["last_session"] = max(entry["last_session"], row["last_session"])
+    rollup = sorted(totals.items(), key=lambda item: (-item[1]["last_session"].toordinal(), item[0]))
+    patients = Paginator(rollup, 20).get_page(request.GET.get("patients_page"))
+
+    # Archived rows are always older than live ones, so the live status wins when present
+    def latest_status(model):
+        return Subquery(
+            model.objects.filter(counselor=request.user, patient=OuterRef("pk"))
+            .order_by("-date", "-time", "-id")
+            .values("status")[:1]
+        )
 
-        sessions = Appointment.objects.filter(counselor=request.user).order_by('patient__full_name', '-date', '-time')
+    page_ids = [patient_id for patient_id, _ in patients.object_list]
+    users = User.objects.filter(id__in=page_ids).only("id", "full_name").annotate(
+        latest_status=Coalesce(latest_status(Appointment), latest_status(ArchivedAppointment))
+    ).in_bulk()
+    patients.object_list = [users[patient_id] for patient_id in page_ids]
+    for patient in patients.object_list:
+        patient.sessions_count = totals[patient.id]["sessions_count"]
+        patient.last_session = totals[patient.id]["last_session"]
 
-    return render(request, 'core/patient_records.html', {'sessions': sessions})
+    try:
+        sessions, next_cursor = session_history(request.GET.get("cursor"), counselor=request.user, **name_filter)
+    except InvalidCursor:
+        sessions, next_cursor = session_history(counselor=request.user, **name_filter)
+
+    return render(request, 'core/patient_records.html', {
+        'patients': patients,
+        'sessions': sessions,
+        'next_cursor': next_cursor,
+        'paged': bool(request.GET.get("cursor")),
+        'query': query,
+    })
 
 @login_required
+@query_budget(8)
 def past_sessions(request):
-    sessions = Appointment.objects.filter(patient=request.user).order_by('-date', '-time')
-    return render(request, 'core/past_sessions.html', {'sessions': sessions})
+    try:
+        sessions, next_cursor = session_history(request.GET.get('cursor'), patient=request.user)
+    except InvalidCursor:
+        sessions, next_cursor = session_history(patient=request.user)
+    return render(request, 'core/past_sessions.html', {
+        'sessions': sessions,
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+@query_budget(8)
+def get_session_history(request):
+    """
+    Load-more endpoint for the history pages: ?cursor=<next_cursor> returns
+    the next page as data plus the rendered cards.
+    """
+    if request.user.role == 'counselor':
+        owner = {'counselor': request.user}
+        query = request.GET.get('q', '').strip()
+        if query:
+            owner['patient__full_name__icontains'] = query
+        card_template = 'core/patient_session_card.html'
+    else:
+        owner = {'patient': request.user}
+        card_template = 'core/past_session_card.html'
+
+    try:
+        sessions, next_cursor = session_history(request.GET.get('cursor'), **owner)
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    return JsonResponse({
+        "sessions": [
+            {
+                "id": s.id,
+                "counselor_name": s.counselor.full_name,
+                "patient_name": s.patient.full_name,
+                "date": s.date.strftime("%Y-%m-%d"),
+                "time": s.time.strftime("%I:%M %p"),
+                "status": s.status,
+                "counselor_notes": s.counselor_notes or "",
+            }
+            for s in sessions
+        ],
+        "html": "".join(render_to_string(card_template, {"session": s}, request=request) for s in sessions),
+        "next_cursor": next_cursor,
+    })
 
 
 @login_required
@@ -333,6 +603,7 @@ def counselor_profile_update(request):
                 user.degree_certificate = request.FILES['degree_certificate']
 
             user.save()
+            counselor_profile_changed(user.id)
             messages.success(request, "Profile updated successfully!")
             return redirect('counselor_dashboard')
 
@@ -343,22 +614,7 @@ def counselor_profile_update(request):
     # GET request: render form prefilled
     return render(request, "core/counselor_profile_update.html", {
         "user": user,
-        "specializations": [
-            "Anxiety & Stress",
-            "Depression & Mood",
-            "Relationship Issues",
-            "Trauma & PTSD",
-            "Grief & Loss",
-            "Self-Esteem",
-            "Life Transitions",
-            "Work Stress",
-            "Financial Stress",
-            "Academic Pressure",
-            "Parenting",
-            "Anger Management",
-            "Mindfulness",
-            "Other Mild Concerns"
-        ],
+        "specializations": SPECIALIZATIONS,
         "selected_specializations": user.specializations or []
     })
 
@@ -387,6 +643,7 @@ def counselor_profile(request):
         user.specializations = specializations if specializations else []
 
         user.save()
+        counselor_profile_changed(user.id)
 
         # Return JSON if AJAX
         if request.headers.get("x-requested-with") == "XMLHttpRequest":
@@ -405,6 +662,7 @@ def counselor_profile(request):
 
     return render(request, "core/counselor_profile_update.html", {
         "user": user,
+        "specializations": SPECIALIZATIONS,
         "selected_specializations": user.specializations or []
     })
 
@@ -412,6 +670,7 @@ def counselor_profile(request):
 
 @login_required
 @csrf_exempt
+@idempotent
 def book_counselor(request, counselor_id):
     counselor = get_object_or_404(User, id=counselor_id, role='counselor')
 
@@ -420,34 +679,13 @@ def book_counselor(request, counselor_id):
         if not slot_id:
             return JsonResponse({'error': 'Invalid data'}, status=400)
 
-        slot = get_object_or_404(Availability, id=slot_id, counselor=counselor)
-        remaining = slot.total_slots - slot.booked_slots
-        if remaining <= 0:
-            return JsonResponse({'error': 'This slot is fully booked'}, status=400)
-
-        # Check if user already booked a session today
-        today = timezone.now().date()
-        existing_booking = Appointment.objects.filter(
-            patient=request.user,
-            date=slot.date  # slot.date is the date of this slot
-        ).exists()
-
-        if existing_booking:
-            return JsonResponse({
-                'error': 'Sorry! You can only book once per day'
-            }, status=400)
-
-        # Increment booked slots
-        slot.booked_slots += 1
-        slot.save()
-
-        # Create appointment
-        Appointment.objects.create(
-            patient=request.user,
-            counselor=counselor,
-            date=slot.date,
-            time=slot.start_time
-        )
+        # Seat claim + appointment insert happen in one transaction (see core.services)
+        try:
+            book_slot(request.user, counselor, slot_id)
+        except SlotFullError as e:
+            return JsonResponse({'error': str(e), 'can_join_waitlist': True}, status=400)
+        except BookingError as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
         return JsonResponse({'success': True})
 
@@ -455,9 +693,90 @@ def book_counselor(request, counselor_id):
 
 
 
+@login_required
+@csrf_exempt
+def hold_slot(request, slot_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    try:
+        expires_at = place_hold(request.user, slot_id)
+    except SlotFullError as e:
+        return JsonResponse({'error': str(e), 'can_join_waitlist': True}, status=400)
+    except BookingError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'expires_in': int(expires_at - time.time())})
+
+
+@login_required
+@csrf_exempt
+def release_slot_hold(request, slot_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    try:
+        release_hold(request.user, slot_id)
+    except BookingError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'success': True})
+
+
+@login_required
+@csrf_exempt
+def join_slot_waitlist(request, slot_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    try:
+        _, position = join_waitlist(request.user, slot_id)
+    except BookingError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'position': position})
+
+
+@login_required
+@csrf_exempt
+def leave_slot_waitlist(request, slot_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    WaitlistEntry.objects.filter(slot_id=slot_id, patient=request.user).delete()
+    return JsonResponse({'success': True})
+
+
 @login_required
 def get_availability(request):
-    slots = Availability.objects.filter(counselor=request.user)
+    """
+    The counselor's own slots, one window/page at a time.
+
+    ?from=YYYY-MM-DD (default today) &to=YYYY-MM-DD &limit=N (max 200)
+    &cursor=<next_cursor from the previous page>. Pages are keyset ranges on
+    (date, start_time, id), so deep pages cost the same as the first.
+    """
+    materialize_rules([request.user.id])
+    try:
+        date_from = request.GET.get("from")
+        date_from = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else timezone.localdate()
+        date_to = request.GET.get("to")
+        date_to = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else None
+        limit = max(1, min(int(request.GET.get("limit", 100)), 200))
+        cursor = request.GET.get("cursor")
+        after = decode_cursor(cursor, date, dt_time, int) if cursor else None
+    except ValueError:
+        return JsonResponse({"error": "Invalid window or cursor"}, status=400)
+
+    vacations = VacationPeriod.objects.filter(
+        counselor=request.user, start_date__lte=OuterRef("date"), end_date__gte=OuterRef("date")
+    )
+    slots = Availability.objects.filter(counselor=request.user, date__gte=date_from).annotate(on_vacation=Exists(vacations))
+    if date_to:
+        slots = slots.filter(date__lte=date_to)
+    if after:
+        slots = slots.filter(keyset_filter(("date", "start_time", "id"), after))
+    slots = list(slots.order_by("date", "start_time", "id")[:limit + 1])
+
+    next_cursor = None
+    if len(slots) > limit:
+        slots = slots[:limit]
+        last = slots[-1]
+        next_cursor = encode_cursor(last.date, last.start_time, last.id)
+
     data = [
         {
             "id": s.id,
@@ -466,14 +785,16 @@ def get_availability(request):
             "start_time": s.start_time.strftime("%I:%M %p"),
             "end_time": s.end_time.strftime("%I:%M %p"),
             "total_slots": s.total_slots,
-            "booked_slots": s.booked_slots
+            "booked_slots": s.booked_slots,
+            "on_vacation": s.on_vacation,
         }
         for s in slots
     ]
-    return JsonResponse({"slots": data})
+    return JsonResponse({"slots": data, "next_cursor": next_cursor})
 
 @csrf_exempt
 @login_required
+@idempotent
 def add_availability(request):
     if request.method == "POST":
         try:
@@ -492,6 +813,11 @@ def add_availability(request):
             start_time_obj = datetime.strptime(start_time, "%I:%M %p").time()
             end_time_obj = datetime.strptime(end_time, "%I:%M %p").time()
 
+            if start_time_obj >= end_time_obj:
+                return JsonResponse({"success": False, "message": "End time must be after start time"})
+            if find_overlapping(request.user.id, [(date_obj, start_time_obj, end_time_obj)]):
+                return JsonResponse({"success": False, "message": "This slot overlaps an existing slot"})
+
             # Create slot
             slot = Availability.objects.create(
                 counselor=request.user,
@@ -501,6 +827,7 @@ def add_availability(request):
                 total_slots=total_slots,
                 booked_slots=0
             )
+            availability_changed(request.user.id)
 
             return JsonResponse({"success": True, "slot_id": slot.id})
 
@@ -508,12 +835,72 @@ def add_availability(request):
             return JsonResponse({"success": False, "message": str(e)})
 
 
+@csrf_exempt
+@login_required
+@idempotent
+def bulk_add_availability(request):
+    """
+    Create many slots at once: {"slots": [{date, start_time, end_time, total_slots}, ...]}.
+
+    Invalid or overlapping entries are reported by index; the rest go in
+    with a single bulk_create.
+    """
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Invalid request"})
+    try:
+        items = json.loads(request.body).get("slots") or []
+    except (ValueError, AttributeError):
+        return JsonResponse({"success": False, "message": "Invalid JSON"})
+    if not isinstance(items, list) or len(items) > 500:
+        return JsonResponse({"success": False, "message": "Send a list of at most 500 slots"})
+
+    errors = []
+    parsed = []  # (request index, Availability)
+    for index, item in enumerate(items):
+        try:
+            date_obj = datetime.strptime(item["date"], "%Y-%m-%d").date()
+            start_time_obj = datetime.strptime(item["start_time"], "%I:%M %p").time()
+            end_time_obj = datetime.strptime(item["end_time"], "%I:%M %p").time()
+            total_slots = int(item.get("total_slots", 1))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            errors.append({"index": index, "message": "Missing or invalid fields"})
+            continue
+        if start_time_obj >= end_time_obj or total_slots < 1:
+            errors.append({"index": index, "message": "End time must be after start time"})
+            continue
+        parsed.append((index, Availability(
+            counselor=request.user,
+            weekday=date_obj.strftime("%A"),  # bulk_create skips save()
+            date=date_obj,
+            start_time=start_time_obj,
+            end_time=end_time_obj,
+            total_slots=total_slots,
+        )))
+
+    overlapping = find_overlapping(request.user.id, [(s.date, s.start_time, s.end_time) for _, s in parsed])
+    to_create = []
+    for position, (index, slot) in enumerate(parsed):
+        if position in overlapping:
+            errors.append({"index": index, "message": "Overlaps an existing slot"})
+        else:
+            to_create.append(slot)
+
+    Availability.objects.bulk_create(to_create)
+    if to_create:
+        availability_changed(request.user.id)
+
+    errors.sort(key=lambda e: e["index"])
+    return JsonResponse({"success": not errors, "created": len(to_create), "errors": errors})
+
+
 @login_required
 @csrf_exempt
+@idempotent
 def delete_availability(request, slot_id):
     try:
         slot = Availability.objects.get(id=slot_id, counselor=request.user)
         slot.delete()
+        availability_changed(request.user.id)
         return JsonResponse({"success": True})
     except Availability.DoesNotExist:
         return JsonResponse({"success": False, "message": "Slot not found"})
@@ -527,19 +914,100 @@ def copy_last_week(request):
         last_week_start = today - timedelta(days=7)
         last_week_end = last_week_start + timedelta(days=6)
         slots = Availability.objects.filter(counselor=request.user, date__range=[last_week_start, last_week_end])
-        for slot in slots:
-            # Calculate next week same weekday
-            next_week_date = slot.date + timedelta(days=7)
-            Availability.objects.create(
+        copies = [
+            Availability(
                 counselor=request.user,
                 weekday=slot.weekday,
-                date=next_week_date,
+                date=slot.date + timedelta(days=7),
                 start_time=slot.start_time,
-                end_time=slot.end_time
+                end_time=slot.end_time,
+                total_slots=slot.total_slots,
             )
-        return JsonResponse({"success": True})
+            for slot in slots
+        ]
+        # Same weekday next week; one INSERT, skipping copies that would overlap an existing slot
+        overlapping = find_overlapping(request.user.id, [(c.date, c.start_time, c.end_time) for c in copies])
+        copies = [c for i, c in enumerate(copies) if i not in overlapping]
+        Availability.objects.bulk_create(copies, ignore_conflicts=True)
+        availability_changed(request.user.id)
+        return JsonResponse({"success": True, "created": len(copies), "skipped": len(overlapping)})
+    return JsonResponse({"success": False, "message": "Invalid request"})
+
+
+# -----------------------------
+# RECURRING WEEKLY RULES
+# -----------------------------
+
+def serialize_rule(rule):
+    return {
+        "id": rule.id,
+        "weekday": rule.weekday,
+        "start_time": rule.start_time.strftime("%I:%M %p"),
+        "end_time": rule.end_time.strftime("%I:%M %p"),
+        "total_slots": rule.total_slots,
+    }
+
+
+@login_required
+def get_availability_rules(request):
+    rules = AvailabilityRule.objects.filter(counselor=request.user)
+    return JsonResponse({"rules": [serialize_rule(r) for r in rules]})
+
+
+@csrf_exempt
+@login_required
+def add_availability_rule(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+
+            weekday = data.get("weekday")
+            start_time = data.get("start_time")
+            end_time = data.get("end_time")
+            total_slots = int(data.get("total_slots", 1))
+
+            if weekday not in dict(WEEKDAYS) or not start_time or not end_time:
+                return JsonResponse({"success": False, "message": "Missing fields"})
+
+            start_time_obj = datetime.strptime(start_time, "%I:%M %p").time()
+            end_time_obj = datetime.strptime(end_time, "%I:%M %p").time()
+            if start_time_obj >= end_time_obj:
+                return JsonResponse({"success": False, "message": "End time must be after start time"})
+
+            # Dates where the rule would overlap an existing slot are skipped when materializing
+            rule, _ = AvailabilityRule.objects.update_or_create(
+                counselor=request.user,
+                weekday=weekday,
+                start_time=start_time_obj,
+                end_time=end_time_obj,
+                defaults={"total_slots": total_slots},
+            )
+            materialize_rules([request.user.id])
+
+            return JsonResponse({"success": True, "rule": serialize_rule(rule)})
+
+        except Exception as e:
+            return JsonResponse({"success": False, "message": str(e)})
     return JsonResponse({"success": False, "message": "Invalid request"})
 
+
+@login_required
+@csrf_exempt
+def delete_availability_rule(request, rule_id):
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Invalid request"})
+    try:
+        rule = AvailabilityRule.objects.get(id=rule_id, counselor=request.user)
+    except AvailabilityRule.DoesNotExist:
+        return JsonResponse({"success": False, "message": "Rule not found"})
+
+    # Drop the future rows it generated, but never ones somebody already booked
+    # (those, like past rows, keep existing with rule set to NULL)
+    Availability.objects.filter(rule=rule, booked_slots=0).upcoming().delete()
+    rule.delete()
+    availability_changed(request.user.id)
+    return JsonResponse({"success": True})
+
 @csrf_exempt
 @login_required
 def clear_week(request):
@@ -547,8 +1015,12 @@ def clear_week(request):
         today = date.today()
         week_start = today
         week_end = today + timedelta(days=6)
-        Availability.objects.filter(counselor=request.user, date__range=[week_start, week_end]).delete()
-        return JsonResponse({"success": True})
+        # Booked slots stay; their patients still have sessions
+        deleted, _ = Availability.objects.filter(
+            counselor=request.user, date__range=[week_start, week_end], booked_slots=0
+        ).delete()
+        availability_changed(request.user.id)
+        return JsonResponse({"success": True, "deleted": deleted})
     return JsonResponse({"success": False, "message": "Invalid request"})
 
 @csrf_exempt
@@ -557,15 +1029,46 @@ def vacation_mode(request):
     if request.method == "POST":
         import json
         data = json.loads(request.body)
-        start = data.get("start")
-        end = data.get("end")
-        if not start or not end:
+        try:
+            start = datetime.strptime(data.get("start") or "", "%Y-%m-%d").date()
+            end = datetime.strptime(data.get("end") or "", "%Y-%m-%d").date()
+        except ValueError:
             return JsonResponse({"success": False, "message": "Invalid dates"})
-        Availability.objects.filter(counselor=request.user, date__range=[start, end]).delete()
-        return JsonResponse({"success": True})
+        if end < start:
+            return JsonResponse({"success": False, "message": "End date must be after start date"})
+        # One row; slots in the range are hidden by the vacation overlay, not deleted
+        vacation = VacationPeriod.objects.create(counselor=request.user, start_date=start, end_date=end)
+        availability_changed(request.user.id)
+        return JsonResponse({"success": True, "vacation": serialize_vacation(vacation)})
     return JsonResponse({"success": False, "message": "Invalid request"})
 
 
+def serialize_vacation(vacation):
+    return {
+        "id": vacation.id,
+        "start": vacation.start_date.strftime("%Y-%m-%d"),
+        "end": vacation.end_date.strftime("%Y-%m-%d"),
+    }
+
+
+@login_required
+def get_vacations(request):
+    vacations = VacationPeriod.objects.filter(counselor=request.user, end_date__gte=timezone.localdate())
+    return JsonResponse({"vacations": [serialize_vacation(v) for v in vacations]})
+
+
+@csrf_exempt
+@login_required
+def end_vacation(request, vacation_id):
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Invalid request"})
+    deleted, _ = VacationPeriod.objects.filter(id=vacation_id, counselor=request.user).delete()
+    if not deleted:
+        return JsonResponse({"success": False, "message": "Vacation not found"}, status=404)
+    availability_changed(request.user.id)
+    return JsonResponse({"success": True})
+
+
 
 
 
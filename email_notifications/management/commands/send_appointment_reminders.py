@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+
+from core.models import Appointment
+from email_notifications.models import AppointmentReminder
+from email_notifications.utils import build_appointment_reminder
+
+# Hours before the session at which a reminder goes out
+REMINDER_WINDOWS = getattr(settings, 'APPOINTMENT_REMINDER_WINDOWS', (24, 1))
+
+
+def starting_between(start, end):
+    """
+    Q for appointments whose (date, time) falls in [start, end]. Written as
+    a range over the (date, time) index rather than combining the columns.
+    """
+    if start.date() == end.date():
+        return Q(date=start.date(), time__gte=start.time(), time__lte=end.time())
+    return (
+        Q(date=start.date(), time__gte=start.time())
+        | Q(date__gt=start.date(), date__lt=end.date())
+        | Q(date=end.date(), time__lte=end.time())
+    )
+
+
+def describe(hours):
+    return '1 hour' if hours == 1 else f'{hours} hours'
+
+
+class Command(BaseCommand):
+    help = (
+        "Email patients a reminder before their sessions. Run it from cron "
+        "(e.g. every 10 minutes); each window is only sent once per appointment."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--windows', default=','.join(str(h) for h in REMINDER_WINDOWS),
+            help='Comma-separated hours before the session, e.g. "24,1"',
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails per send_messages() call')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be sent')
+
+    def handle(self, *args, **opts):
+        windows = sorted({int(h) for h in opts['windows'].split(',') if h.strip()})
+        if not windows:
+            self.stderr.write('No reminder windows configured')
+            return
+
+        now = timezone.localtime().replace(tzinfo=None)
+        appointments = list(
+            Appointment.objects.filter(starting_between(now, now + timedelta(hours=windows[-1])))
+            .exclude(status__in=['cancelled', 'completed'])
+            .select_related('patient', 'counselor')
+            .order_by('date', 'time')
+        )
+        already_sent = set(
+            AppointmentReminder.objects.filter(appointment__in=appointments)
+            .values_list('appointment_id', 'window')
+        )
+
+        # Each appointment gets the tightest window it falls into
+        due = []
+        for appointment in appointments:
+            starts = datetime.combine(appointment.date, appointment.time)
+            hours = next(h for h in windows if starts <= now + timedelta(hours=h))
+            if (appointment.id, f'{hours}h') not in already_sent:
+                due.append((appointment, hours))
+
+        if opts['dry_run']:
+            self.stdout.write(f'Would send {len(due)} reminder(s) ({len(appointments)} upcoming appointment(s) checked)')
+            return
+        if not due:
+            self.stdout.write('No reminders due')
+            return
+
+        template = get_template('email_notifications/appointment_reminder.html')
+        connection = get_connection()
+        sent = failed = 0
+        batch_size = opts['batch_size']
+        try:
+            connection.open()
+        except OSError as e:
+            # SMTP host unreachable; nothing was marked sent, so the next run retries everything
+            self.stderr.write(f'Could not connect to the mail server: {e}')
+            return
+        try:
+            for i in range(0, len(due), batch_size):
+                batch = due[i:i + batch_size]
+                messages = [
+                    build_appointment_reminder(template, appointment, describe(hours), connection=connection)
+                    for appointment, hours in batch
+                ]
+                try:
+                    connection.send_messages(messages)
+                except Exception as e:
+                    # Leave the batch unmarked so the next run retries it
+                    failed += len(batch)
+                    self.stderr.write(f'Batch of {len(batch)} failed: {e}')
+                    if not self.reconnect(connection):
+                        failed += len(due) - i - len(batch)
+                        break
+                    continue
+                AppointmentReminder.objects.bulk_create(
+                    [AppointmentReminder(appointment=appointment, window=f'{hours}h') for appointment, hours in batch],
+                    ignore_conflicts=True,
+                )
+                sent += len(batch)
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} reminder(s), {failed} failed'))
+
+    def reconnect(self, connection):
+        try:
+            connection.close()
+        except OSError:
+            pass
+        try:
+            connection.open()
+        except OSError as e:
+            self.stderr.write(f'Could not reconnect to the mail server, stopping: {e}')
+            return False
+        return True
@@ -1,3 +1,14 @@
 from django.db import models
 
-# Create your models here.
+
+class AppointmentReminder(models.Model):
+    """One row per reminder sent, so each window is only mailed once per appointment."""
+    appointment = models.ForeignKey('core.Appointment', on_delete=models.CASCADE, related_name='reminders')
+    window = models.CharField(max_length=10)  # e.g. "24h", "1h"
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('appointment', 'window')
+
+    def __str__(self):
+        return f"{self.window} reminder for appointment {self.appointment_id}"
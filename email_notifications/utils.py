@@ -57,4 +57,27 @@ def send_counselor_rejection_email(counselor_email, counselor_name):
         return True
     except Exception as e:
         print(f"Error sending rejection email: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def build_appointment_reminder(template, appointment, starts_in, connection=None):
+    """
+    Reminder message for one appointment. `template` is an already-loaded
+    (compiled) template so a batch doesn't re-parse it per email.
+    """
+    html_content = template.render({
+        'patient_name': appointment.patient.full_name,
+        'counselor_name': appointment.counselor.full_name,
+        'date': appointment.date,
+        'time': appointment.time,
+        'meet_link': appointment.google_meet_link,
+        'starts_in': starts_in,
+    })
+    email = EmailMultiAlternatives(
+        'Reminder: Your MindEase Session Is Coming Up',
+        strip_tags(html_content),
+        settings.DEFAULT_FROM_EMAIL,
+        [appointment.patient.email],
+        connection=connection,
+    )
+    email.attach_alternative(html_content, "text/html")
+    return email
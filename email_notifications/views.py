@@ -3,6 +3,7 @@ from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
 from accounts.models import User
+from core.services import counselor_profile_changed
 from .utils import send_counselor_approval_email, send_counselor_rejection_email
 
 @require_POST
@@ -14,6 +15,7 @@ def approve_counselor(request, counselor_id):
         counselor.is_verified = True
         counselor.is_active = True
         counselor.save()
+        counselor_profile_changed(counselor.id)  # list or delist in the search and matching indexes
         
         # Send approval email
         email_sent = send_counselor_approval_email(counselor.email, counselor.full_name)
@@ -38,6 +40,7 @@ def reject_counselor(request, counselor_id):
         counselor.is_verified = False
         counselor.is_active = False
         counselor.save()
+        counselor_profile_changed(counselor.id)  # list or delist in the search and matching indexes
         
         # Send rejection email
         email_sent = send_counselor_rejection_email(counselor.email, counselor.full_name)